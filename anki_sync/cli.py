@@ -1,12 +1,16 @@
-import click
-import genanki
+import pathlib
 
+import click
 
-from anki_sync.config import get_config, load_config_from_env
+from anki_sync.config import get_config, load_config_from_env, update_config
+from anki_sync.core.engine import SyncEngine
 from anki_sync.core.gsheets import GoogleSheetsManager
-from anki_sync.core.models.genanki import Deck, DeckInfo
+from anki_sync.core.models.genanki import DeckInfo, Package
 from anki_sync.core.models.word import Word
+from anki_sync.core.sources import SOURCES, SheetCache
 from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.synthesizers.audio_synthesizer import AudioSynthesizer
+from anki_sync.utils.metrics import get_metrics
 
 
 @click.group()
@@ -18,6 +22,7 @@ def main() -> None:
     Greek words, and creates an Anki package (.apkg) file.
     """
 
+
 @main.command(name="config")
 def show_config() -> None:
     """Show current configuration."""
@@ -26,30 +31,97 @@ def show_config() -> None:
     config.print_config()
 
 
-def process_deck(
-    anki_db: AnkiDatabase,
-    gsheets: GoogleSheetsManager,
-    deck: Deck,
-    decks: list[DeckInfo],
-    synthesizer,
-) -> list[dict]:
-    """Process decks and return rows to update."""
-    rows_to_update = []
-    deck_meta = DeckInfo(
-        sheet="words",
-        note_class=Word,
-        synthesizer=synthesizer,
+def deck_infos(sheets: list[str], synthesizer, source="remote") -> list[DeckInfo]:
+    """DeckInfo of every `sheet` or `sheet=Deck name` spec."""
+    return [
+        DeckInfo.from_spec(
+            spec, note_class=Word, synthesizer=synthesizer, source=source
+        )
+        for spec in sheets
+    ]
+
+
+@main.command(name="pull")
+@click.option(
+    "--sheet",
+    "sheets",
+    multiple=True,
+    help="Sheet to pull, repeatable. Defaults to $SHEETS.",
+)
+def pull(sheets: tuple[str, ...]) -> None:
+    """Copy the sheets to the local cache read by `sync --source cache`."""
+    load_config_from_env()
+    config = get_config()
+    decks = deck_infos(list(sheets) or config.sheets, config.audio_synthesizer)
+
+    gsheets = GoogleSheetsManager(config.google_sheet_id)
+    cache = SheetCache()
+    # the manager keeps what it reads in the cache, unchanged sheets are skipped
+    values = gsheets.batch_get_values([deck_info.sheet for deck_info in decks], Word)
+    for sheet, sheet_values in values.items():
+        path = cache.path(sheet)
+        click.secho(
+            f"{sheet}: {max(len(sheet_values) - 1, 0)} rows pulled to {path}",
+            fg="green",
+        )
+
+
+@main.command(name="backfill-audio")
+@click.option("--sheet", default="words", show_default=True)
+def backfill_audio(sheet: str) -> None:
+    """Synthesize the audio of every word that doesn't have any yet."""
+    load_config_from_env()
+    config = get_config()
+
+    if not config.validate():
+        click.secho(
+            "Configuration validation failed. Please check your environment variables.",
+            fg="red",
+        )
+        return
+
+    gsheets = GoogleSheetsManager(config.google_sheet_id)
+    words = Word.from_values(gsheets.get_values(sheet, Word))
+
+    synth = AudioSynthesizer(config.anki_media_path, config.audio_synthesizer)
+    stats = synth.backfill(word.get_audio_meta() for word in words)
+    click.secho(
+        f"audio: {stats['generated']} generated, {stats['cached']} from cache, "
+        f"{stats['failed']} failed, {stats['exists']} already present",
+        fg="green",
     )
-    rtu = deck.generate(anki_db, gsheets, deck_meta)
-    rows_to_update.extend(rtu)
-    return rows_to_update
 
 
 @main.command(name="sync")
-def sync() -> None:
+@click.option(
+    "--metrics-json",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Write per-stage timings and counters of the run to this file.",
+)
+@click.option(
+    "--sheet",
+    "sheets",
+    multiple=True,
+    help="Sheet to sync as SHEET or SHEET=DECK, repeatable. Defaults to $SHEETS.",
+)
+@click.option(
+    "--source",
+    type=click.Choice(SOURCES),
+    help="Read the sheets from Google Sheets, $SOURCE_DIR/<sheet>.csv or .parquet, "
+    "or the copy made by `pull`. Defaults to $SOURCE.",
+)
+def sync(
+    metrics_json: pathlib.Path | None, sheets: tuple[str, ...], source: str | None
+) -> None:
     """Sync command to synchronize data from Google Sheets to Anki."""
     load_config_from_env()
+    if source:
+        update_config(source=source)
     config = get_config()
+    metrics = get_metrics()
+    decks = deck_infos(
+        list(sheets) or config.sheets, config.audio_synthesizer, config.source
+    )
 
     if not config.validate():
         click.secho(
@@ -63,24 +135,60 @@ def sync() -> None:
     click.secho(f"ANKI_DB_PATH   : {config.anki_db_path}", fg="blue")
     click.secho(f"ANKI_MEDIA_PATH: {config.anki_media_path}", fg="blue")
 
-    gsheets = GoogleSheetsManager(config.google_sheet_id)
-    deck = Deck("Greek", config.anki_media_path)
-    package = genanki.Package(deck)
-
-    with AnkiDatabase(config.anki_db_path) as anki_db:
-        rows_to_update = process_deck(
-            anki_db, gsheets, deck, deck, config.audio_synthesizer
-        )
+    click.secho(f"SOURCE         : {config.source}", fg="blue")
+
+    # local sources run without any Google API access
+    gsheets = None
+    if config.source == "remote":
+        gsheets = GoogleSheetsManager(config.google_sheet_id)
+        # before the sheets are read, so those rows keep the GUIDs already packaged
+        try:
+            gsheets.resume_write_back()
+        except RuntimeError as e:
+            click.secho(f"{e}: {e.__cause__}", fg="red")
+
+    with AnkiDatabase(
+        config.anki_db_path, snapshot=config.snapshot_collection
+    ) as anki_db:
+        if anki_db.read_path != config.anki_db_path:
+            click.secho(f"READING        : {anki_db.read_path}", fg="blue")
+        engine = SyncEngine(anki_db, gsheets, config.anki_media_path)
+        built, rows_to_update = engine.run(decks)
 
         click.secho(f"writing package to {config.output_filename}", fg="yellow")
-        package.media_files.extend(deck.audio_files)
-        package.write_to_file(config.output_filename)
+        package = Package(built)
+        for deck in built:
+            package.media_files.extend(deck.media)
+        with metrics.timer("package.write_to_file"):
+            package.write_to_file(config.output_filename)
+        for deck in built:
+            deck.save_snapshot()
+        click.secho(
+            f"package: {package.stats['media_written']} media written, "
+            f"{package.stats['media_reused']} reused",
+            fg="yellow",
+        )
 
-    if rows_to_update:
+    if rows_to_update and gsheets is None:
+        click.secho(
+            f"{len(rows_to_update)} new GUIDs were not written back to the sheets "
+            f"while reading from {config.source}, sync from remote to keep them",
+            fg="red",
+        )
+    elif rows_to_update:
         click.secho("Updating sheets with missing GUIDs")
-        gsheets.batch_update(rows_to_update)
+        try:
+            gsheets.batch_update(rows_to_update)
+        except RuntimeError as e:
+            click.secho(f"{e}: {e.__cause__}", fg="red")
 
     click.secho("Deck created successfully", fg="green")
 
+    click.echo(metrics.summary())
+    if metrics_json:
+        metrics.dump_json(metrics_json)
+        click.secho(f"metrics written to {metrics_json}", fg="yellow")
+
+
 if __name__ == "__main__":
     main()
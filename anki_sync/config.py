@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Literal
 
@@ -20,16 +20,40 @@ class Config:
     google_api_key: str = os.environ.get("GOOGLE_API_KEY", "")
     elevenlabs_api_key: str = os.environ.get("ELEVENLABS_API_KEY", "")
 
+    # Sheets to sync, each one as `sheet` or `sheet=Deck name`
+    sheets: list[str] = field(default_factory=lambda: ["words"])
+    # Where sheets are read from: "remote", "csv", "parquet" or "cache", the last
+    # being the copy made by `anki-sync pull`. csv and parquet files are read from
+    # source_dir as <sheet>.csv / <sheet>.parquet.
+    source: Literal["remote", "csv", "parquet", "cache"] = "remote"
+    source_dir: Path = Path(".")
+    # Ask Drive whether the spreadsheet changed and reuse the copy of the last
+    # read when it didn't, instead of downloading every sheet on every run.
+    conditional_fetch: bool = True
+
     # Audio synthesis settings
     audio_synthesizer: Literal["elevenlabs", "google"] = "elevenlabs"
 
     # Performance settings
     max_workers: int = 3
     chunk_size: int = 1000
+    # How review history is carried into the package: "prefetch" loads it into
+    # memory first, "attach" copies it in SQL from the attached collection. The
+    # latter needs the package written by anki_sync's Package, whose connection
+    # is opened with uri=True; plain genanki.Package can't attach it.
+    history_copy: Literal["attach", "prefetch"] = "prefetch"
+    # Read a copy of the collection made with the sqlite backup API so a long sync
+    # never holds a lock on the collection Anki is using.
+    snapshot_collection: bool = False
 
     # Output settings
     output_filename: str = "greek.apkg"
 
+    # Local state kept between runs (sheet snapshots, caches, manifests)
+    cache_dir: Path = Path(
+        os.environ.get("ANKI_SYNC_CACHE_DIR", Path.home() / ".cache/anki-sync")
+    )
+
     @property
     def anki_path(self) -> Path:
         """Get the full Anki user directory path."""
@@ -49,10 +73,10 @@ class Config:
         """Validate that all required configuration is present."""
         errors = []
 
-        if not self.google_sheet_id:
+        if self.source == "remote" and not self.google_sheet_id:
             errors.append("GOOGLE_SHEET_ID environment variable is required")
 
-        if not self.google_application_credentials:
+        if self.source == "remote" and not self.google_application_credentials:
             errors.append(
                 "GOOGLE_APPLICATION_CREDENTIALS environment variable is required"
             )
@@ -84,10 +108,17 @@ class Config:
         print(f"  Database: {self.anki_db_path}")
         print(f"  Media: {self.anki_media_path}")
         print(f"  Google Sheet ID: {self.google_sheet_id}")
+        print(f"  Sheets: {', '.join(self.sheets)}")
+        print(f"  Source: {self.source}")
+        print(f"  Source Dir: {self.source_dir}")
+        print(f"  Conditional Fetch: {self.conditional_fetch}")
         print(f"  Audio Synthesizer: {self.audio_synthesizer}")
         print(f"  Max Workers: {self.max_workers}")
         print(f"  Chunk Size: {self.chunk_size}")
+        print(f"  History Copy: {self.history_copy}")
+        print(f"  Snapshot Collection: {self.snapshot_collection}")
         print(f"  Output File: {self.output_filename}")
+        print(f"  Cache Dir: {self.cache_dir}")
 
 
 # Global configuration instance
@@ -108,6 +139,20 @@ def update_config(**kwargs) -> None:
             print(f"Warning: Unknown configuration key '{key}'")
 
 
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str, default: list[str]) -> list[str]:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 def load_config_from_env() -> None:
     """Load configuration from environment variables."""
     update_config(
@@ -119,8 +164,17 @@ def load_config_from_env() -> None:
         elevenlabs_api_key=os.environ.get(
             "ELEVENLABS_API_KEY", config.elevenlabs_api_key
         ),
+        sheets=_env_list("SHEETS", config.sheets),
+        source=os.environ.get("SOURCE", config.source),
+        source_dir=Path(os.environ.get("SOURCE_DIR", config.source_dir)),
+        conditional_fetch=_env_flag("CONDITIONAL_FETCH", config.conditional_fetch),
         audio_synthesizer=os.environ.get("AUDIO_SYNTHESIZER", config.audio_synthesizer),
         max_workers=int(os.environ.get("MAX_WORKERS", config.max_workers)),
         chunk_size=int(os.environ.get("CHUNK_SIZE", config.chunk_size)),
+        history_copy=os.environ.get("HISTORY_COPY", config.history_copy),
+        snapshot_collection=_env_flag(
+            "SNAPSHOT_COLLECTION", config.snapshot_collection
+        ),
         output_filename=os.environ.get("OUTPUT_FILENAME", config.output_filename),
+        cache_dir=Path(os.environ.get("ANKI_SYNC_CACHE_DIR", config.cache_dir)),
     )
@@ -0,0 +1,125 @@
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import click
+
+from anki_sync.core.gsheets import GoogleSheetsManager
+from anki_sync.core.models.genanki import Deck, DeckInfo
+from anki_sync.core.models.genanki.deck import audio_summary
+from anki_sync.core.sources import load_values
+from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.synthesizers.audio_synthesizer import AudioSynthesizer
+from anki_sync.utils.metrics import metrics
+
+# Name of the deck every sheet is synced under.
+ROOT_DECK = "Greek"
+
+
+class SyncEngine:
+    """Builds one deck per sheet and returns them for a single package.
+
+    Every remote sheet is fetched with one batch request, sheets with a local
+    source are read from it, see `load_values`, and the decks are generated
+    concurrently, so their audio synthesis and Sheets/Anki waits overlap. With a
+    single sheet the deck is the root deck itself, otherwise each sheet gets a
+    subdeck of it.
+    """
+
+    def __init__(
+        self,
+        anki_db: AnkiDatabase,
+        gsheets: Optional[GoogleSheetsManager],
+        media_dir: pathlib.Path,
+        root_deck: str = ROOT_DECK,
+        max_workers: Optional[int] = None,
+    ):
+        self.anki_db = anki_db
+        self.gsheets = gsheets
+        self.media_dir = media_dir
+        self.root_deck = root_deck
+        self.max_workers = max_workers
+
+    def deck_name(self, deck_info: DeckInfo, deck_count: int) -> str:
+        if deck_count == 1 and not deck_info.deck:
+            return self.root_deck
+        return f"{self.root_deck}::{deck_info.deck_name}"
+
+    def load(self, decks: list[DeckInfo]) -> dict[str, list[list[str]]]:
+        """Get the values of every sheet, the remote ones batched per note class.
+
+        Only the columns the note class reads are fetched from remote sheets.
+        """
+        remote: dict[type, list[str]] = {}
+        for deck_info in decks:
+            if deck_info.source == "remote":
+                remote.setdefault(deck_info.note_class, []).append(deck_info.sheet)
+        values = {}
+        if remote and self.gsheets is None:
+            sheets = [sheet for sheets in remote.values() for sheet in sheets]
+            raise ValueError(f"{sheets} are read remotely but Sheets isn't set up")
+        for note_class, sheets in remote.items():
+            values.update(self.gsheets.batch_get_values(sheets, note_class))
+        for deck_info in decks:
+            if deck_info.source != "remote":
+                values[deck_info.sheet] = load_values(deck_info.sheet, deck_info.source)
+        return values
+
+    @metrics.timed("engine.run")
+    def run(self, decks: list[DeckInfo]) -> tuple[list[Deck], list[dict]]:
+        """Generate a deck per DeckInfo.
+
+        Returns:
+            The generated decks, in the order given, and the GUIDs to write back
+            to the sheets
+        """
+        sheets = [deck_info.sheet for deck_info in decks]
+        if len(set(sheets)) != len(sheets):
+            raise ValueError(f"every sheet can only be synced once: {sheets}")
+        if not decks:
+            return [], []
+
+        values = self.load(decks)
+        # built once up front rather than by whichever deck gets there first
+        self.anki_db.load_guid_index()
+
+        built = [
+            Deck(self.deck_name(deck_info, len(decks)), self.media_dir)
+            for deck_info in decks
+        ]
+        # one synthesizer per provider so a phrase used by several sheets is
+        # only synthesized once, and one writer of the audio cache index
+        synths: dict[str, AudioSynthesizer] = {}
+        for deck_info in decks:
+            if deck_info.synthesizer not in synths:
+                synths[deck_info.synthesizer] = AudioSynthesizer(
+                    self.media_dir, deck_info.synthesizer
+                )
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers or len(decks), thread_name_prefix="deck"
+        ) as pool:
+            futures = [
+                pool.submit(
+                    deck.generate,
+                    self.anki_db,
+                    self.gsheets,
+                    deck_info,
+                    values[deck_info.sheet],
+                    len(decks) == 1,
+                    synths[deck_info.synthesizer],
+                )
+                for deck, deck_info in zip(built, decks)
+            ]
+            rows_to_update = []
+            for deck, future in zip(built, futures):
+                rows_to_update.extend(future.result())
+                deck.print_report()
+
+        for name, synth in synths.items():
+            label = "audio" if len(synths) == 1 else f"{name} audio"
+            click.secho(f"{label}: {audio_summary(synth.join())}", fg="yellow")
+        for deck, deck_info in zip(built, decks):
+            deck.report_missing_media(synths[deck_info.synthesizer].media_files)
+
+        return built, rows_to_update
@@ -1,12 +1,41 @@
-from typing import Any
+import json
+import os
+import pathlib
+import re
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
 import pandas as pd
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
+from anki_sync.config import get_config
 from anki_sync.core.auth.auth import GoogleAuth  # For Union type hint
+from anki_sync.core.sources import SheetCache
+from anki_sync.utils.a1 import column_letter, quote_sheet
+from anki_sync.utils.metrics import metrics
+from anki_sync.utils.retry import get_scheduler
+
+if TYPE_CHECKING:
+    from anki_sync.core.models.word import Word
+
+# Cells sent per batchUpdate request, a large write-back is split into several
+# requests instead of depending on a single giant one.
+WRITE_CHUNK_CELLS = 2000
+
+# A single cell or a range within one column, e.g. words!A5 or words!A5:A9
+_COLUMN_RANGE = re.compile(
+    r"^(?P<sheet>.+)!(?P<column>[A-Z]+)(?P<first>\d+)(?::(?P=column)(?P<last>\d+))?$"
+)
 
 
 class GoogleSheetsManager(GoogleAuth):
+    """Reads and writes the values of a spreadsheet.
+
+    Every sheet read is kept in the local SheetCache along with the Drive
+    revision of the spreadsheet it was read at. As long as Drive reports the
+    same revision, reads are served from that copy instead of downloading the
+    sheet again.
+    """
 
     def __init__(self, sheet_id: str) -> None:
         super().__init__()
@@ -16,30 +45,298 @@ class GoogleSheetsManager(GoogleAuth):
             "sheets", "v4", credentials=self.certs, cache_discovery=False
         )
         self._values_service = self._sheets_service.spreadsheets().values()
+        self._drive_service = build(
+            "drive", "v3", credentials=self.certs, cache_discovery=False
+        )
+        # quota errors are retried and shared with every other Sheets call
+        self._scheduler = get_scheduler("sheets")
 
+        self._cache = SheetCache()
+        self._conditional = get_config().conditional_fetch
+        # revision of the spreadsheet, looked up once and dropped after writes
+        self._revision: Optional[str] = None
+
+    @metrics.timed("sheets.revision")
+    def revision(self) -> Optional[str]:
+        """Drive version and modified time of the spreadsheet.
+
+        None when conditional fetches are turned off or Drive can't be asked,
+        in which case every read downloads the sheet.
+        """
+        if not self._conditional:
+            return None
+        if self._revision is None:
+            request = self._drive_service.files().get(
+                fileId=self._sheet_id, fields="version,modifiedTime"
+            )
+            try:
+                meta = self._scheduler.call(request.execute)
+            except HttpError as e:
+                print(f"Can't get the revision of the spreadsheet, reading it all: {e}")
+                self._conditional = False
+                return None
+            self._revision = f"{meta['version']}@{meta['modifiedTime']}"
+        return self._revision
+
+    def _cached_values(self, sheet: str, revision: Optional[str]):
+        values = self._cache.fresh(sheet, revision) if revision else None
+        if values is not None:
+            metrics.count("sheets.cache_hits")
+        return values
+
+    @metrics.timed("sheets.batch_update")
     def batch_update(self, updates: list[dict[str, Any]]):
+        """Write cell updates, `{"range": "words!A5", "values": [["guid"]]}`.
+
+        Updates of adjacent rows of a column are merged into one range and the
+        ranges are sent in requests of at most WRITE_CHUNK_CELLS cells, each
+        retried on its own. A checkpoint under cache_dir records the chunks
+        that haven't landed yet, see `resume_write_back`.
+        """
         if not updates:
             return
 
-        body = {"valueInputOption": "USER_ENTERED", "data": updates}
-        self._values_service.batchUpdate(
-            spreadsheetId=self._sheet_id, body=body
-        ).execute()
+        metrics.count("sheets.cells_updated", len(updates))
+        self._write(coalesce_updates(updates, WRITE_CHUNK_CELLS))
+
+    @metrics.timed("sheets.resume_write_back")
+    def resume_write_back(self) -> int:
+        """Send what an interrupted write-back left behind, returns the cells sent.
+
+        Meant to run before the sheets are read, so rows that already got a
+        GUID in the last package keep it instead of getting a new one. When
+        the write-back stopped at a known revision, the cells are only written
+        if the spreadsheet is still at it, i.e. nobody moved rows since, and
+        only where they are still empty. Without revisions each row must still
+        read exactly as it did when the write-back stopped. Anything else is
+        dropped and those rows get new GUIDs from this sync.
+        """
+        checkpoint = self._checkpoint()
+        pending = checkpoint.pending()
+        if not pending:
+            return 0
+
+        revision = self.revision()
+        if revision is not None and checkpoint.revision is not None:
+            if revision != checkpoint.revision:
+                return self._drop_write_back(checkpoint, "the spreadsheet changed")
+            updates = self._empty_cells(pending)
+        elif checkpoint.rows is not None:
+            updates = self._unchanged_rows(pending, checkpoint.rows)
+        else:
+            return self._drop_write_back(checkpoint, "its rows can't be checked")
+
+        checkpoint.clear()
+        if updates:
+            print(f"Resending {len(updates)} GUIDs of an interrupted write-back")
+            self._write(coalesce_updates(updates, WRITE_CHUNK_CELLS))
+        return len(updates)
+
+    def _checkpoint(self) -> "WriteBackCheckpoint":
+        return WriteBackCheckpoint(
+            get_config().cache_dir / "write_back" / f"{self._sheet_id}.json"
+        )
+
+    @staticmethod
+    def _drop_write_back(checkpoint: "WriteBackCheckpoint", reason: str) -> int:
+        ranges = [update["range"] for update in checkpoint.pending()]
+        print(
+            f"Dropping {len(ranges)} ranges of an interrupted write-back, {reason}: "
+            + ", ".join(ranges)
+        )
+        checkpoint.clear()
+        return 0
+
+    def _empty_cells(self, updates: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Single cell updates of `updates` whose cell is currently empty."""
+        current = self._batch_get([update["range"] for update in updates])
+        empty = []
+        for update, values in zip(updates, current):
+            for cell, value, offset in _cells(update):
+                row = values[offset] if offset < len(values) else []
+                if not row or row[0] == "":
+                    empty.append({"range": cell, "values": [[value]]})
+        return empty
+
+    def _read_rows(
+        self, updates: list[dict[str, Any]]
+    ) -> Optional[list[list[list[Any]]]]:
+        """Whole rows of the cells of `updates`, None if they can't be read."""
+        try:
+            return self._batch_get([_row_range(update) for update in updates])
+        except Exception as e:
+            print(f"Can't read the rows of the failed write-back: {e}")
+            return None
+
+    def _unchanged_rows(
+        self, updates: list[dict[str, Any]], rows: list[list[list[Any]]]
+    ) -> list[dict[str, Any]]:
+        """Single cell updates of `updates` whose row still reads like `rows`.
+
+        The rows were read when the write-back stopped, with the cells still
+        empty, so a row that moved or got its cell filled since doesn't match.
+        """
+        current = self._batch_get([_row_range(update) for update in updates])
+        unchanged = []
+        for update, before, now in zip(updates, rows, current):
+            for cell, value, offset in _cells(update):
+                row = _trimmed(before[offset]) if offset < len(before) else []
+                if row and row == _trimmed(now[offset] if offset < len(now) else []):
+                    unchanged.append({"range": cell, "values": [[value]]})
+        return unchanged
+
+    def _write(self, updates: list[dict[str, Any]]) -> None:
+        chunks = chunk_updates(updates, WRITE_CHUNK_CELLS)
+        metrics.count("sheets.update_requests", len(chunks))
+        checkpoint = self._checkpoint()
+        checkpoint.start(chunks)
+
+        errors = []
+        for index, chunk in enumerate(chunks):
+            body = {"valueInputOption": "USER_ENTERED", "data": chunk}
+            request = self._values_service.batchUpdate(
+                spreadsheetId=self._sheet_id, body=body
+            )
+            try:
+                self._scheduler.call(request.execute)
+            except Exception as e:
+                errors.append(e)
+                continue
+            checkpoint.landed(index)
+        # our own write is a new revision, the cached copies are out of date
+        self._revision = None
+
+        if errors:
+            # the revision including the chunks that did land, any later edit
+            # of the spreadsheet invalidates the pending ones; the rows are
+            # what the pending ones are checked against without revisions
+            revision = self.revision()
+            rows = self._read_rows(checkpoint.unsent()) if revision is None else None
+            checkpoint.stopped(revision, rows)
+            if revision is not None:
+                outcome = "sent again on the next sync unless the spreadsheet changes"
+            elif rows is not None:
+                outcome = "sent again on the next sync unless their rows change"
+            else:
+                outcome = "dropped, their rows can't be checked"
+            raise RuntimeError(
+                f"{len(errors)} of {len(chunks)} write-back requests failed, "
+                f"they are {outcome}, see {checkpoint.path}"
+            ) from errors[0]
+        checkpoint.clear()
+
+    @metrics.timed("sheets.get_rows")
+    def get_values(
+        self, sheet: str, note_class: Optional[type["Word"]] = None
+    ) -> list[list[str]]:
+        """Get the raw cell values of a sheet, header row first.
+
+        Rows are returned as sent by the API, trailing empty cells are omitted,
+        unless the sheet is served from the cache which pads every row. With a
+        `note_class` only its columns are read, see `batch_get_values`.
+        """
+        if note_class is not None:
+            return self.batch_get_values([sheet], note_class)[sheet]
+
+        revision = self.revision()
+        values = self._cached_values(sheet, revision)
+        if values is not None:
+            return values
+
+        request = self._values_service.get(spreadsheetId=self._sheet_id, range=sheet)
+        values = self._scheduler.call(request.execute).get("values", [])
+        metrics.count("sheets.rows_fetched", max(len(values) - 1, 0))
+        self._cache.save(sheet, values, revision)
+        return values
+
+    @metrics.timed("sheets.batch_get")
+    def batch_get_values(
+        self, sheets: list[str], note_class: Optional[type["Word"]] = None
+    ) -> dict[str, list[list[str]]]:
+        """Get the raw cell values of several sheets with a single request.
+
+        Returns the values of every sheet keyed by sheet name, see `get_values`.
+        Only the sheets without an up to date cached copy are requested.
+
+        With a `note_class` the headers are read first and then only the columns
+        its field map reads from, formatted the same as a full read or an export
+        of the sheet. The other columns keep their name in the header but are
+        left empty in every row, so column indexes still match the sheet.
+        """
+        revision = self.revision()
+        key = revision
+        if revision and note_class is not None:
+            key = f"{revision}/{note_class.__name__}"
+        result = {sheet: self._cached_values(sheet, key) for sheet in sheets}
+        missing = [sheet for sheet, values in result.items() if values is None]
+        if not missing:
+            return result
+
+        if note_class is None:
+            fetched = dict(zip(missing, self._batch_get(missing)))
+        else:
+            fetched = self._batch_get_columns(missing, note_class)
+
+        for sheet in missing:
+            result[sheet] = fetched[sheet]
+            metrics.count("sheets.rows_fetched", max(len(result[sheet]) - 1, 0))
+            self._cache.save(sheet, result[sheet], key)
+        return result
+
+    def _batch_get(self, ranges: list[str], **options) -> list[list[list[Any]]]:
+        request = self._values_service.batchGet(
+            spreadsheetId=self._sheet_id, ranges=ranges, **options
+        )
+        value_ranges = self._scheduler.call(request.execute).get("valueRanges", [])
+        # value ranges come back in the order they were requested
+        values = [value_range.get("values", []) for value_range in value_ranges]
+        return values + [[] for _ in range(len(ranges) - len(values))]
+
+    def _batch_get_columns(
+        self, sheets: list[str], note_class: type["Word"]
+    ) -> dict[str, list[list[str]]]:
+        """Read the header of each sheet, then only the columns of `note_class`."""
+        header_rows = self._batch_get([f"{quote_sheet(sheet)}!1:1" for sheet in sheets])
+        headers = {
+            sheet: [str(cell) for cell in rows[0]] if rows else []
+            for sheet, rows in zip(sheets, header_rows)
+        }
+
+        ranges = []
+        starts = []
+        for sheet, header in headers.items():
+            columns = note_class.field_map(header).columns
+            metrics.count("sheets.columns_skipped", len(header) - len(columns))
+            for start, end in _column_runs(columns):
+                ranges.append(
+                    f"{quote_sheet(sheet)}!{column_letter(start)}2:{column_letter(end)}"
+                )
+                starts.append((sheet, start))
+
+        cells: dict[str, dict[int, list[str]]] = {sheet: {} for sheet in sheets}
+        if ranges:
+            runs = self._batch_get(
+                ranges, majorDimension="COLUMNS", valueRenderOption="FORMATTED_VALUE"
+            )
+            for (sheet, start), run in zip(starts, runs):
+                for offset, column in enumerate(run):
+                    cells[sheet][start + offset] = column
+
+        return {
+            sheet: _rows_from_columns(header, cells[sheet])
+            for sheet, header in headers.items()
+        }
 
     def get_rows(self, sheet: str) -> pd.DataFrame:
-        values = (
-            self._values_service.get(
-                spreadsheetId=self._sheet_id, range=sheet
-            ).execute()
-        ).get("values", [])
+        values = self.get_values(sheet)
+        if len(values) == 0:
+            return pd.DataFrame()
 
         expected_columns = len(values[0])
         for v in values:
             if len(v) < expected_columns:
                 v.extend([""] * (expected_columns - len(v)))
 
-        if len(values) == 0:
-            return pd.DataFrame()
         return pd.DataFrame(values[1:], columns=values[0])
 
     def get_notes(self, sheet: str) -> pd.DataFrame:
@@ -49,3 +346,177 @@ class GoogleSheetsManager(GoogleAuth):
                 if col in data:
                     data[col] = data[col].fillna("")
         return data
+
+
+def _column_runs(columns: list[int]) -> list[tuple[int, int]]:
+    """Group sorted column indexes into (first, last) runs of adjacent columns."""
+    runs: list[tuple[int, int]] = []
+    for idx in columns:
+        if runs and runs[-1][1] == idx - 1:
+            runs[-1] = (runs[-1][0], idx)
+        else:
+            runs.append((idx, idx))
+    return runs
+
+
+def _rows_from_columns(
+    header: list[str], columns: dict[int, list[str]]
+) -> list[list[str]]:
+    """Turn the columns read by index back into header-first rows."""
+    if not header:
+        return []
+    height = max(map(len, columns.values()), default=0)
+    rows = [[""] * len(header) for _ in range(height)]
+    for idx, column in columns.items():
+        for row, value in zip(rows, column):
+            row[idx] = value
+    return [header, *rows]
+
+
+class WriteBackCheckpoint:
+    """Chunks of a write-back and which of them landed, kept until all did.
+
+    Once the write-back stopped with chunks still pending, `revision` is the
+    spreadsheet's revision at that point, None if it couldn't be told, in which
+    case `rows` holds the rows of the pending cells, one list per update.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.chunks: list[dict[str, Any]] = []
+        self.revision: Optional[str] = None
+        self.rows: Optional[list[list[list[Any]]]] = None
+
+    def pending(self) -> list[dict[str, Any]]:
+        """Updates of the chunks a previous write-back didn't get through."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.chunks = data["chunks"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return []
+        self.revision = data.get("revision")
+        self.rows = data.get("rows")
+        return self.unsent()
+
+    def unsent(self) -> list[dict[str, Any]]:
+        return [
+            update
+            for chunk in self.chunks
+            if not chunk["done"]
+            for update in chunk["data"]
+        ]
+
+    def start(self, chunks: list[list[dict[str, Any]]]) -> None:
+        self.chunks = [{"data": chunk, "done": False} for chunk in chunks]
+        self.revision = None
+        self.rows = None
+        self._save()
+
+    def landed(self, index: int) -> None:
+        self.chunks[index]["done"] = True
+        self._save()
+
+    def stopped(
+        self, revision: Optional[str], rows: Optional[list[list[list[Any]]]] = None
+    ) -> None:
+        self.revision = revision
+        self.rows = rows
+        self._save()
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"revision": self.revision, "rows": self.rows, "chunks": self.chunks},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+
+def _cells(update: dict[str, Any]) -> Iterator[tuple[str, Any, int]]:
+    """Cell, value and row offset of every cell of a single column update."""
+    match = _COLUMN_RANGE.match(update["range"])
+    if match is None:
+        return
+    first = int(match["first"])
+    for offset, (value,) in enumerate(update["values"]):
+        yield f"{match['sheet']}!{match['column']}{first + offset}", value, offset
+
+
+def _row_range(update: dict[str, Any]) -> str:
+    """The whole rows a single column update writes to, e.g. `words!4:5`."""
+    match = _COLUMN_RANGE.match(update["range"])
+    if match is None:
+        return update["range"]
+    return f"{match['sheet']}!{match['first']}:{match['last'] or match['first']}"
+
+
+def _trimmed(row: list[Any]) -> list[Any]:
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return list(row[:end])
+
+
+def coalesce_updates(
+    updates: list[dict[str, Any]], max_cells: int = WRITE_CHUNK_CELLS
+) -> list[dict[str, Any]]:
+    """Merge updates of adjacent rows of the same column into single ranges.
+
+    Later updates of a cell replace earlier ones. Ranges are capped at
+    `max_cells` rows, updates spanning several columns are passed through.
+    """
+    columns: dict[tuple[str, str], dict[int, Any]] = {}
+    other = []
+    for update in updates:
+        match = _COLUMN_RANGE.match(update["range"])
+        values = update["values"]
+        if match is None or any(len(row) != 1 for row in values):
+            other.append(update)
+            continue
+        cells = columns.setdefault((match["sheet"], match["column"]), {})
+        first = int(match["first"])
+        for row, value in enumerate(values, start=first):
+            cells[row] = value[0]
+
+    merged = []
+    for (sheet, column), cells in columns.items():
+        block: list[int] = []
+        for row in sorted(cells):
+            if block and (row != block[-1] + 1 or len(block) == max_cells):
+                merged.append(_column_update(sheet, column, block, cells))
+                block = []
+            block.append(row)
+        merged.append(_column_update(sheet, column, block, cells))
+    return merged + other
+
+
+def chunk_updates(
+    updates: list[dict[str, Any]], max_cells: int = WRITE_CHUNK_CELLS
+) -> list[list[dict[str, Any]]]:
+    """Pack updates into request-sized chunks of about `max_cells` cells."""
+    chunks: list[list[dict[str, Any]]] = []
+    size = 0
+    for update in updates:
+        cells = sum(len(row) for row in update["values"])
+        if not chunks or size + cells > max_cells:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(update)
+        size += cells
+    return chunks
+
+
+def _column_update(
+    sheet: str, column: str, rows: list[int], cells: dict[int, Any]
+) -> dict[str, Any]:
+    cell_range = f"{sheet}!{column}{rows[0]}"
+    if len(rows) > 1:
+        cell_range += f":{column}{rows[-1]}"
+    return {"range": cell_range, "values": [[cells[row]] for row in rows]}
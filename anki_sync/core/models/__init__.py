@@ -11,12 +11,13 @@ from .constants import (
     Tense,
 )
 from .genanki import Card, Deck, DeckInfo, Note, Rev
-from .word import AudioMeta, Word
+from .word import AudioMeta, FieldMap, Word
 
 __all__ = [
     # Word models
     "Word",
     "AudioMeta",
+    "FieldMap",
     # Genanki models
     "Deck",
     "DeckInfo",
@@ -2,7 +2,20 @@
 
 from .card import Card
 from .deck import Deck, DeckInfo
+from .media import MediaFile, MediaManifest
 from .note import Note
+from .package import Package
 from .rev import Rev
+from .writer import BulkWriter
 
-__all__ = ["Deck", "DeckInfo", "Note", "Card", "Rev"]
+__all__ = [
+    "Deck",
+    "DeckInfo",
+    "Note",
+    "Card",
+    "Rev",
+    "BulkWriter",
+    "Package",
+    "MediaFile",
+    "MediaManifest",
+]
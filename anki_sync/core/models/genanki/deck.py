@@ -1,19 +1,37 @@
+import contextlib
 import hashlib
-import os
 import pathlib
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Literal, Optional
 
 import attr
 import click
 import genanki
 
+from anki_sync.config import get_config
 from anki_sync.core.gsheets import GoogleSheetsManager
+from anki_sync.core.models.constants import ANKI_NOTE_MODEL
 
 if TYPE_CHECKING:
     from anki_sync.core.models.word import Word
 
+from anki_sync.core.snapshot import SheetSnapshot, SnapshotEntry, snapshot_path
+from anki_sync.core.sources import load_values
 from anki_sync.core.sql import AnkiDatabase
-from anki_sync.core.synthesizers.audio_synthesizer import AudioSynthesizer
+from anki_sync.core.synthesizers.audio_synthesizer import AudioMeta, AudioSynthesizer
+
+from .media import MediaManifest
+from .note import Note
+from .writer import BulkWriter
+
+
+def audio_summary(stats) -> str:
+    return (
+        f"{stats['generated']} generated, "
+        f"{stats['cached']} from cache, {stats['failed']} failed, "
+        f"{stats['exists']} already present, "
+        f"{stats['duplicate']} duplicates "
+        f"({stats['stats_saved']} existence checks answered from the media index)"
+    )
 
 
 @attr.s(auto_attribs=True, init=True)
@@ -21,7 +39,20 @@ class DeckInfo:
     sheet: str
     note_class: type["Word"]
     synthesizer: Literal["elevenlabs", "google"] = "google"
-    source: str = "remote"
+    # Where the sheet's rows are read from, see sources.load_values.
+    source: Literal["remote", "csv", "parquet", "cache"] = "remote"
+    # Name of the subdeck the sheet is synced to, defaults to the sheet's name.
+    deck: str = ""
+
+    @classmethod
+    def from_spec(cls, spec: str, **kwargs) -> "DeckInfo":
+        """Parse a `sheet` or `sheet=Deck name` spec as given on the command line."""
+        sheet, _, deck = spec.partition("=")
+        return cls(sheet=sheet.strip(), deck=deck.strip(), **kwargs)
+
+    @property
+    def deck_name(self) -> str:
+        return self.deck or self.sheet.replace("_", " ").title()
 
 
 class Deck(genanki.Deck):
@@ -30,36 +61,120 @@ class Deck(genanki.Deck):
         deck_id = int(hashlib.md5(deck_name.encode("utf-8")).hexdigest(), 16) % (10**10)
         super().__init__(deck_id, deck_name)
         self.media_dir = media_dir
-        self.audio_files = []
+        self.media = MediaManifest(media_dir)
+        # collection and notes whose history is copied once the notes are written
+        self._history: tuple[AnkiDatabase, list[int]] | None = None
+        # output of `generate` held back while other decks are generated
+        self.report: list[tuple[str, dict]] = []
+        self._buffered = False
+        # rows of the sheet as of this run, saved once the package is written
+        self.snapshot: Optional[SheetSnapshot] = None
 
     def add_audio(self, audio_filename: str):
-        path = os.path.join(self.media_dir, audio_filename)
-        self.audio_files.append(path)
+        if audio_filename:
+            self.media.add(audio_filename)
+
+    def write_to_db(self, cursor, timestamp: float, id_gen):
+        """Write the deck with notes, cards and revlog flushed in bulk."""
+        with BulkWriter(cursor, get_config().chunk_size) as writer:
+            super().write_to_db(writer, timestamp, id_gen)
+
+        if self._history is not None:
+            anki_db, note_ids = self._history
+            anki_db.copy_history(cursor, note_ids, self.deck_id)
 
     def generate(
-        self, anki_db: AnkiDatabase, gsheet: GoogleSheetsManager, deck_info: DeckInfo
+        self,
+        anki_db: AnkiDatabase,
+        gsheet: Optional[GoogleSheetsManager],
+        deck_info: DeckInfo,
+        values: Optional[list[list[str]]] = None,
+        show_progress: bool = True,
+        synth: Optional[AudioSynthesizer] = None,
     ):
-        gnotes = gsheet.get_notes(deck_info.sheet)
+        """Build the notes of a sheet and return the GUIDs to write back to it.
 
-        synth = AudioSynthesizer(self.media_dir, deck_info.synthesizer)
+        `values` are the sheet's cells when they were already fetched, e.g. by the
+        SyncEngine's batch request, otherwise they are read from the deck's source
+        and `gsheet` is only needed for remote sheets.
+
+        When several decks are generated at the same time they share `synth`,
+        which the caller joins before calling `report_missing_media`, and
+        `show_progress` is off: the progress bar is left out and the deck's
+        output is kept in `report` for the caller to print.
+        """
+        self._buffered = not show_progress
+        self.report = []
+        if values is None:
+            values = load_values(
+                deck_info.sheet,
+                deck_info.source,
+                gsheet,
+                note_class=deck_info.note_class,
+            )
+        header, rows = (values[0], values[1:]) if values else ([], [])
+        field_map = deck_info.note_class.field_map(header)
+        guid_column = header.index("guid") if "guid" in header else None
+        anki_db.load_guid_index()
+
+        own_synth = synth is None
+        if synth is None:
+            synth = AudioSynthesizer(self.media_dir, deck_info.synthesizer)
+        snapshot = SheetSnapshot(
+            snapshot_path(
+                get_config().google_sheet_id, deck_info.sheet, deck_info.note_class
+            )
+        )
+        hash_row = snapshot.row_hasher(header)
 
         rows_to_update = []
-        with click.progressbar(
-            gnotes.iterrows(),
-            label="Processing words",
-            item_show_func=lambda d: d[1]["english"] if d else "",
-        ) as bar:
-            for row in bar:
-                gnote = deck_info.note_class.from_sheets(row)
+        existing_note_ids = []
+        if show_progress:
+            progress = click.progressbar(
+                enumerate(rows),
+                length=len(rows),
+                label=f"Processing {deck_info.sheet}",
+                item_show_func=lambda d: field_map.get(d[1], "english") if d else "",
+            )
+        else:
+            progress = contextlib.nullcontext(enumerate(rows))
+        with progress as bar:
+            for index, row in bar:
+                row = field_map.pad(row)
+                guid = row[guid_column] if guid_column is not None else ""
+                row_hash = hash_row(row)
+                entry = snapshot.lookup(guid, row_hash)
+                anote = self._note_from_snapshot(anki_db, guid, entry)
+                if anote is not None:
+                    self.add_audio(entry.audio_filename)
+                    self.add_note(anote)
+                    synth.submit(AudioMeta(entry.phrase, entry.audio_filename))
+                    snapshot.keep(anote.guid)
+                    existing_note_ids.append(anote.id)
+                    continue
+
+                gnote = deck_info.note_class.from_row(field_map, index, row)
                 anote = gnote.to_note(anki_db)
+                audio = gnote.get_audio_meta()
 
-                self.add_audio(gnote.audio_filename)
+                self.add_audio(audio.filename)
                 self.add_note(anote)
 
-                audio = gnote.get_audio_meta()
-                synth.synthesize_if_needed(audio.phrase, audio.filename)
+                synth.submit(audio)
+                snapshot.record(
+                    anote.guid,
+                    SnapshotEntry(
+                        hash=row_hash,
+                        fields=list(anote.fields),
+                        tags=list(anote.tags),
+                        phrase=audio.phrase,
+                        audio_filename=audio.filename,
+                    ),
+                )
 
-                if not gnote.exists_in_anki():
+                if gnote.exists_in_anki():
+                    existing_note_ids.append(anote.id)
+                else:
                     cell = f"{deck_info.sheet}!{gnote._google_sheet_cell}"
                     rows_to_update.append(
                         {
@@ -68,6 +183,83 @@ class Deck(genanki.Deck):
                         }
                     )
 
-                    print(f"        + {gnote.guid}: {gnote.english}")
+                    self._echo(f"        + {gnote.guid}: {gnote.english}")
+
+        if get_config().history_copy == "attach":
+            self._history = (anki_db, existing_note_ids)
+        else:
+            anki_db.prefetch_history(existing_note_ids)
+
+        self.snapshot = snapshot
+        self._echo(
+            f"{deck_info.sheet} rows: {snapshot.stats['added']} added, "
+            f"{snapshot.stats['changed']} changed, {snapshot.deleted} deleted, "
+            f"{snapshot.stats['unchanged']} reused",
+            fg="yellow",
+        )
+
+        if own_synth:
+            click.secho(
+                f"{deck_info.sheet} audio: {audio_summary(synth.join())}", fg="yellow"
+            )
+            self.report_missing_media(synth.media_files)
 
         return rows_to_update
+
+    def save_snapshot(self) -> None:
+        """Store the rows of the last `generate`, call once the package is written.
+
+        Until then the previous snapshot stays, so a failed write doesn't leave
+        rows looking synced that never made it into a package.
+        """
+        if self.snapshot is not None:
+            self.snapshot.save()
+
+    def report_missing_media(self, present: Optional[frozenset[str]] = None) -> None:
+        """Resolve the deck's media once its audio is done, reporting what's missing.
+
+        `present` is the synthesizer's index of the media directory, see
+        `MediaManifest.resolve`.
+        """
+        missing = self.media.resolve(present)
+        if missing:
+            click.secho(
+                f"{len(missing)} audio files are missing and won't be packaged: "
+                + ", ".join(missing),
+                fg="red",
+            )
+
+    def print_report(self) -> None:
+        for message, style in self.report:
+            click.secho(message, **style)
+        self.report = []
+
+    def _echo(self, message: str, **style) -> None:
+        if self._buffered:
+            self.report.append((message, style))
+        else:
+            click.secho(message, **style)
+
+    def _note_from_snapshot(
+        self, anki_db: AnkiDatabase, guid: str, entry: SnapshotEntry | None
+    ) -> Note | None:
+        """Rebuild the note of an unchanged row from its snapshot entry.
+
+        Only notes that still exist in Anki are reused, anything else goes
+        through the regular Word -> Note path.
+        """
+        if entry is None:
+            return None
+
+        note_id, exists = anki_db.get_note_id_by_guid(guid)
+        if not exists:
+            return None
+
+        return Note(
+            model=ANKI_NOTE_MODEL,
+            guid=guid,
+            id=note_id,
+            fields=list(entry.fields),
+            tags=list(entry.tags),
+            old_db_conn=anki_db,
+        )
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import pathlib
+from typing import Container, Iterator, Optional
+
+import attr
+
+HASH_BUFSIZE = 1024 * 1024
+
+
+@attr.s(auto_attribs=True)
+class MediaFile:
+    """A media file of a deck, stat-ed once when the deck is resolved."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    _sha1: Optional[str] = attr.ib(default=None, repr=False)
+
+    @classmethod
+    def from_path(cls, path: str) -> "MediaFile":
+        stat = os.stat(path)
+        return cls(str(path), stat.st_size, stat.st_mtime_ns)
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def sha1(self) -> str:
+        """Content hash, only read from disk the first time it's needed."""
+        if self._sha1 is None:
+            self._sha1 = hash_file(self.path)
+        return self._sha1
+
+
+class MediaManifest:
+    """Ordered, deduplicated media of a deck.
+
+    Filenames are only recorded while the deck is generated since their audio
+    may still be synthesizing. `resolve` then stats every file once; missing
+    ones are reported and left out so the package never tries to write them.
+    Given the synthesizer's index of the media directory, files that aren't in
+    it are known to be missing without a stat.
+    """
+
+    def __init__(self, media_dir: pathlib.Path):
+        self.media_dir = media_dir
+        self._filenames: dict[str, None] = {}
+        self._files: dict[str, MediaFile] = {}
+        self._missing: dict[str, None] = {}
+
+    def add(self, filename: str) -> None:
+        self._filenames.setdefault(filename)
+
+    def resolve(self, present: Optional[Container[str]] = None) -> list[str]:
+        """Stat the files added since the last call, returns the missing ones.
+
+        `present` are the names known to be in media_dir, if it's given only
+        those are stat-ed.
+        """
+        missing = []
+        for filename in self._filenames:
+            if filename in self._files or filename in self._missing:
+                continue
+            if present is not None and filename not in present:
+                missing.append(filename)
+                continue
+            try:
+                self._files[filename] = MediaFile.from_path(
+                    os.path.join(self.media_dir, filename)
+                )
+            except FileNotFoundError:
+                missing.append(filename)
+        self._missing.update(dict.fromkeys(missing))
+        return missing
+
+    @property
+    def missing(self) -> list[str]:
+        return list(self._missing)
+
+    def __iter__(self) -> Iterator[MediaFile]:
+        self.resolve()
+        return iter(self._files.values())
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_BUFSIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
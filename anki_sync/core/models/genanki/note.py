@@ -4,9 +4,12 @@ from typing import List
 import genanki
 from cached_property import cached_property
 
-from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.sql import AnkiDatabase, Table
+from anki_sync.utils.metrics import metrics
 
 from .card import Card
+from .rev import Rev
+from .writer import BulkWriter
 
 
 class Note(genanki.Note):
@@ -31,19 +34,27 @@ class Note(genanki.Note):
 
     @cached_property
     def cards(self) -> List[Card]:
-        """Get cards associated with this note."""
-        if not self.old_db_conn:
-            return []
+        """Get cards associated with this note.
 
-        card_data = self.old_db_conn.get_cards_by_note_id(self.id)
+        Cards and their revlog come from the history prefetched by
+        `AnkiDatabase.prefetch_history`, the old database is not queried here.
+        When the deck copies the history with `AnkiDatabase.copy_history` instead
+        nothing was prefetched and the note has no cards of its own to write.
+        """
+        if not (self.old_db_conn and self.old_db_conn.history_prefetched):
+            return []
 
         self._cards = []
-        for idx, data in card_data.iterrows():
-            self._cards.append(Card(data, self.old_db_conn))
+        for data in self.old_db_conn.get_prefetched_cards(self.id):
+            revlog = [
+                Rev(rev) for rev in self.old_db_conn.get_prefetched_revlog(data["id"])
+            ]
+            self._cards.append(Card(data, revlog))
         return self._cards
 
-    def write_to_db(self, new_db_conn, *args):
-        """Write the note to the database."""
+    @metrics.timed("note.write_to_db")
+    def write_to_db(self, new_db_conn: BulkWriter, *args):
+        """Queue the note and its cards on the bulk writer."""
         deck_id = args[1]
         self.fields = genanki.builtin_models._fix_deprecated_builtin_models_and_warn(
             self.model, self.fields
@@ -51,8 +62,8 @@ class Note(genanki.Note):
         self._check_number_model_fields_matches_num_fields()
         self._check_invalid_html_tags_in_fields()
 
-        new_db_conn.execute(
-            "INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?);",
+        new_db_conn.insert(
+            Table.NOTES,
             (
                 self.id,  # id
                 self.guid,  # guid
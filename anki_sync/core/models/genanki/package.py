@@ -0,0 +1,311 @@
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import sqlite3
+import struct
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from typing import Optional
+
+import attr
+import genanki
+
+from anki_sync.config import get_config
+from anki_sync.core.synthesizers.base import atomic_write
+from anki_sync.utils.metrics import metrics
+
+from .media import MediaFile
+
+MANIFEST_VERSION = 1
+
+# Media that is already compressed, deflating it again only costs time.
+STORED_SUFFIXES = {".mp3", ".ogg", ".m4a", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Entries written after the media, they are replaced on every write.
+TRAILING_ENTRIES = ("collection.anki2", "media")
+
+COPY_BUFSIZE = 1024 * 1024
+
+# General purpose flag of entries whose sizes follow their data, copied entries
+# have their sizes in the local header instead.
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class MediaEntry:
+    """A media file stored in the package and the state it was stored in."""
+
+    # entry name inside the zip, Anki expects the index of the file
+    name: str
+    size: int
+    mtime_ns: int
+    sha1: str
+
+
+class Package(genanki.Package):
+    """genanki Package that updates the previous .apkg instead of rebuilding it.
+
+    Media entries come first and the collection and media mapping last. When
+    the previous package only lacks some media, its entries are copied over
+    as their raw, still compressed bytes, without reading, hashing or
+    recompressing the media files again, followed by the new media,
+    collection and mapping. A
+    manifest of the last output records what every media entry was made from;
+    if any of that media changed or was removed, or the package itself was
+    touched, the package is rewritten from scratch. Either way the new package
+    is written next to the old one and renamed over it.
+    """
+
+    def __init__(
+        self,
+        deck_or_decks=None,
+        media_files=None,
+        manifest_path: Optional[pathlib.Path] = None,
+    ):
+        super().__init__(deck_or_decks, media_files)
+        self.manifest_path = manifest_path
+        self.stats: Counter[str] = Counter()
+
+    def write_to_file(self, file, timestamp: Optional[float] = None):
+        file = pathlib.Path(file)
+        manifest_path = self.manifest_path or default_manifest_path(file)
+        media = self._collect_media()
+
+        db_path = self._write_collection(timestamp)
+        try:
+            entries = None
+            previous = _load_manifest(manifest_path, file)
+            if previous is not None:
+                entries = self._append(file, previous, media, db_path)
+            if entries is None:
+                entries = self._rewrite(file, media, db_path)
+        finally:
+            os.unlink(db_path)
+
+        _save_manifest(manifest_path, file, entries)
+        for key, value in self.stats.items():
+            metrics.count(f"package.{key}", value)
+
+    def _collect_media(self) -> dict[str, MediaFile]:
+        """Media to store by filename, Anki keys media by name so the first wins.
+
+        `media_files` holds paths or the MediaFile entries of a deck's media
+        manifest, the latter are not stat-ed again.
+        """
+        media = {}
+        for item in self.media_files:
+            if not isinstance(item, MediaFile):
+                item = MediaFile.from_path(item)
+            media.setdefault(item.filename, item)
+        return media
+
+    def _write_collection(self, timestamp: Optional[float]) -> str:
+        fd, db_path = tempfile.mkstemp(suffix=".anki2")
+        os.close(fd)
+
+        if timestamp is None:
+            timestamp = time.time()
+        id_gen = itertools.count(int(timestamp * 1000))
+
+        try:
+            # uri lets decks attach the collection read-only, see copy_history
+            conn = sqlite3.connect(db_path, uri=True)
+            try:
+                self.write_to_db(conn.cursor(), timestamp, id_gen)
+                conn.commit()
+            finally:
+                conn.close()
+        except BaseException:
+            os.unlink(db_path)
+            raise
+        return db_path
+
+    def _append(
+        self,
+        file: pathlib.Path,
+        previous: dict[str, MediaEntry],
+        media: dict[str, MediaFile],
+        db_path: str,
+    ) -> Optional[dict[str, MediaEntry]]:
+        """Add the new media to the previous package's, None if it can't be."""
+        entries = {}
+        for filename, entry in previous.items():
+            if filename not in media:
+                return None
+            media_file = media[filename]
+            if (media_file.size, media_file.mtime_ns) != (entry.size, entry.mtime_ns):
+                # touched but possibly not changed, e.g. relinked from the cache
+                if media_file.size != entry.size or media_file.sha1 != entry.sha1:
+                    return None
+                entry = attr.evolve(entry, mtime_ns=media_file.mtime_ns)
+            entries[filename] = entry
+
+        try:
+            src = zipfile.ZipFile(file)
+        except zipfile.BadZipFile:
+            return None
+        written = 0
+        with src:
+            if not _is_reusable(src, entries.values()):
+                return None
+
+            try:
+                with atomic_write(str(file)) as f, zipfile.ZipFile(f, "w") as z:
+                    for entry in sorted(entries.values(), key=lambda e: int(e.name)):
+                        _copy_entry(src, z, src.getinfo(entry.name))
+
+                    next_index = (
+                        max((int(e.name) for e in entries.values()), default=-1) + 1
+                    )
+                    for filename, media_file in media.items():
+                        if filename in entries:
+                            continue
+                        name = str(next_index)
+                        next_index += 1
+                        entries[filename] = _write_media(z, name, media_file)
+                        written += 1
+                    _write_trailing_entries(z, entries, db_path)
+            except zipfile.BadZipFile:
+                # damaged past its central directory, the old package is kept
+                # by atomic_write and rewritten instead
+                return None
+        self.stats["media_written"] += written
+        self.stats["media_reused"] += len(previous)
+        self.stats["appended"] += 1
+        return entries
+
+    def _rewrite(
+        self,
+        file: pathlib.Path,
+        media: dict[str, MediaFile],
+        db_path: str,
+    ) -> dict[str, MediaEntry]:
+        entries = {}
+        with atomic_write(str(file)) as f, zipfile.ZipFile(f, "w") as z:
+            for idx, (filename, media_file) in enumerate(media.items()):
+                entries[filename] = _write_media(z, str(idx), media_file)
+                self.stats["media_written"] += 1
+            _write_trailing_entries(z, entries, db_path)
+        self.stats["rewritten"] += 1
+        return entries
+
+
+def default_manifest_path(file: pathlib.Path) -> pathlib.Path:
+    digest = hashlib.sha1(str(file.resolve()).encode("utf-8")).hexdigest()[:16]
+    return get_config().cache_dir / "packages" / f"{digest}.json"
+
+
+def _write_media(z: zipfile.ZipFile, name: str, media_file: MediaFile) -> MediaEntry:
+    """Stream a media file into the zip, hashing it on the way."""
+    # built from the manifest's stat rather than ZipInfo.from_file's
+    info = zipfile.ZipInfo(name, time.localtime(media_file.mtime_ns / 1e9)[:6])
+    info.file_size = media_file.size
+    info.external_attr = 0o644 << 16
+    if pathlib.Path(media_file.path).suffix.lower() in STORED_SUFFIXES:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+
+    digest = hashlib.sha1()
+    with open(media_file.path, "rb") as src, z.open(info, "w") as dst:
+        while chunk := src.read(COPY_BUFSIZE):
+            digest.update(chunk)
+            dst.write(chunk)
+    return MediaEntry(name, media_file.size, media_file.mtime_ns, digest.hexdigest())
+
+
+def _write_trailing_entries(
+    z: zipfile.ZipFile, entries: dict[str, MediaEntry], db_path: str
+) -> None:
+    z.write(db_path, "collection.anki2", compress_type=zipfile.ZIP_DEFLATED)
+    mapping = {entry.name: filename for filename, entry in entries.items()}
+    z.writestr("media", json.dumps(mapping), compress_type=zipfile.ZIP_DEFLATED)
+
+
+def _is_reusable(z: zipfile.ZipFile, kept) -> bool:
+    """Whether the previous package has the layout written by this class."""
+    names = z.namelist()
+    if tuple(names[-len(TRAILING_ENTRIES) :]) != TRAILING_ENTRIES:
+        return False
+    return {entry.name for entry in kept} <= set(names)
+
+
+def _copy_entry(src: zipfile.ZipFile, dst: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Copy an entry of the previous package as its raw, still compressed bytes.
+
+    zipfile has no API for this, so the entry's data is located behind its
+    local header and written after a new header the same way ZipFile.open
+    would, then registered for the central directory.
+    """
+    src.fp.seek(info.header_offset)
+    header = struct.unpack(
+        zipfile.structFileHeader, src.fp.read(zipfile.sizeFileHeader)
+    )
+    if header[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"bad local header of {info.filename}")
+    # skip the file name and extra field
+    src.fp.seek(header[10] + header[11], os.SEEK_CUR)
+
+    copy = zipfile.ZipInfo(info.filename, info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    copy.flag_bits = info.flag_bits & ~_DATA_DESCRIPTOR_FLAG
+    copy.CRC = info.CRC
+    copy.compress_size = info.compress_size
+    copy.file_size = info.file_size
+
+    dst._writecheck(copy)
+    copy.header_offset = dst.fp.tell()
+    dst.fp.write(copy.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = src.fp.read(min(COPY_BUFSIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"{info.filename} is truncated")
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+    dst.filelist.append(copy)
+    dst.NameToInfo[copy.filename] = copy
+    dst.start_dir = dst.fp.tell()
+    dst._didModify = True
+
+
+def _load_manifest(
+    path: pathlib.Path, file: pathlib.Path
+) -> Optional[dict[str, MediaEntry]]:
+    """Media entries of the previous package, None if it can't be reused."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        stat = file.stat()
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    if (stat.st_size, stat.st_mtime_ns) != (
+        data["package"]["size"],
+        data["package"]["mtime_ns"],
+    ):
+        return None
+    return {name: MediaEntry(**e) for name, e in data["media"].items()}
+
+
+def _save_manifest(
+    path: pathlib.Path, file: pathlib.Path, entries: dict[str, MediaEntry]
+) -> None:
+    stat = file.stat()
+    data = {
+        "version": MANIFEST_VERSION,
+        "package": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "media": {name: attr.asdict(e) for name, e in entries.items()},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
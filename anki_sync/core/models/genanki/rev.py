@@ -1,4 +1,8 @@
-import pandas as pd
+from typing import Mapping
+
+from anki_sync.core.sql import Table
+
+from .writer import BulkWriter
 
 
 class Rev:
@@ -6,14 +10,11 @@ class Rev:
 
     order = ["id", "cid", "usn", "ease", "ivl", "lastIvl", "factor", "time", "type"]
 
-    def __init__(self, data: pd.DataFrame):
-        data = data.to_dict()
+    def __init__(self, data: Mapping):
         self.values = []
         for ord in self.order:
             self.values.append(data[ord])
 
-    def write_to_db(self, new_db_conn):
-        """Write the revision log entry to the database."""
-        new_db_conn.execute(
-            "INSERT INTO revlog VALUES(?,?,?,?,?,?,?,?,?);", self.values
-        )
+    def write_to_db(self, new_db_conn: BulkWriter):
+        """Queue the revision log entry on the bulk writer."""
+        new_db_conn.insert(Table.REVLOG, self.values)
@@ -0,0 +1,70 @@
+import sqlite3
+from typing import Any, Sequence
+
+from anki_sync.core.sql import Table
+
+INSERT_STATEMENTS = {
+    Table.NOTES: "INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?);",
+    Table.CARDS: "INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?);",
+    Table.REVLOG: "INSERT INTO revlog VALUES(?,?,?,?,?,?,?,?,?);",
+}
+
+# The package database is a throw away temp file, durability does not matter
+# while it is being built.
+BULK_PRAGMAS = [
+    "PRAGMA synchronous = OFF",
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA temp_store = MEMORY",
+]
+
+
+class BulkWriter:
+    """Collects rows per table and flushes them with `executemany`.
+
+    Rows are buffered per table and written in batches of `chunk_size` inside a
+    single transaction.  Any other statement sent through `execute` is passed
+    straight to the cursor so the writer can stand in for it in genanki's
+    `write_to_db` chain.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, chunk_size: int):
+        self.cursor = cursor
+        self.chunk_size = chunk_size
+        self._rows: dict[Table, list[Sequence[Any]]] = {
+            table: [] for table in INSERT_STATEMENTS
+        }
+
+    def __enter__(self) -> "BulkWriter":
+        conn = self.cursor.connection
+        if not conn.in_transaction:
+            for pragma in BULK_PRAGMAS:
+                self.cursor.execute(pragma)
+            self.cursor.execute("BEGIN")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        conn = self.cursor.connection
+        if exc_type:
+            conn.rollback()
+            return
+        self.flush()
+        conn.commit()
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        return self.cursor.execute(query, params)
+
+    def insert(self, table: Table, values: Sequence[Any]) -> None:
+        rows = self._rows[table]
+        rows.append(values)
+        if len(rows) >= self.chunk_size:
+            self._flush_table(table)
+
+    def flush(self) -> None:
+        for table in self._rows:
+            self._flush_table(table)
+
+    def _flush_table(self, table: Table) -> None:
+        rows = self._rows[table]
+        if rows:
+            self.cursor.executemany(INSERT_STATEMENTS[table], rows)
+            rows.clear()
@@ -1,5 +1,8 @@
+import functools
 import json
-from typing import Hashable, cast
+import sys
+from enum import Enum
+from typing import Any, Callable, Hashable, Iterator, Sequence, cast
 
 import attr
 import pandas
@@ -14,17 +17,73 @@ from anki_sync.core.models.constants import (
 )
 from anki_sync.core.models.genanki import Note
 from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.synthesizers.audio_synthesizer import AudioMeta
 from anki_sync.utils.guid import generate_guid
 
 
+def _enum_converter(enum_class: type[Enum]) -> Callable[[Any], Enum]:
+    """Build a converter that maps values to members with a single dict lookup.
+
+    Calling the enum class goes through EnumMeta.__call__ for every value, the
+    lookup table is built once per enum and returns the interned member.
+    """
+    lookup: dict[Any, Enum] = {member.value: member for member in enum_class}
+
+    def convert(value: Any) -> Enum:
+        if value.__class__ is enum_class:
+            return value
+        try:
+            return lookup[value]
+        except (KeyError, TypeError):
+            return enum_class(value)
+
+    return convert
+
+
 @attr.s(auto_attribs=True, frozen=True)
-class AudioMeta:
+class FieldMap:
+    """Column -> field mapping of a sheet, resolved once per header.
+
+    Turning a row into a word is then only tuple indexing.
+    """
 
-    phrase: str
-    filename: str
+    width: int
+    fields: tuple[tuple[str, int], ...]
+    tag_columns: tuple[int, ...]
+
+    @classmethod
+    def from_header(cls, word_class: type["Word"], header: Sequence[str]) -> "FieldMap":
+        names = word_class.field_names()
+        fields = []
+        tag_columns = []
+        for idx, column in enumerate(header):
+            column = str(column).lower()
+            name = column.replace(" ", "_")
+            if name in names:
+                fields.append((name, idx))
+            if "tag" in column:
+                tag_columns.append(idx)
+        return cls(len(header), tuple(fields), tuple(tag_columns))
 
+    @property
+    def columns(self) -> list[int]:
+        """Indexes of the columns a word is read from, in sheet order."""
+        return sorted({idx for _, idx in self.fields} | set(self.tag_columns))
 
-@attr.s(auto_attribs=True, init=False)
+    def pad(self, row: Sequence[str]) -> Sequence[str]:
+        """The API drops trailing empty cells, fill them back in."""
+        if len(row) < self.width:
+            return [*row, *([""] * (self.width - len(row)))]
+        return row
+
+    def get(self, row: Sequence[str], name: str) -> str:
+        for field, idx in self.fields:
+            if field == name:
+                return row[idx]
+        return ""
+
+
+@attr.s(auto_attribs=True, init=False, slots=True)
 class Word:
 
     # Every note will have these fields
@@ -39,12 +98,12 @@ class Word:
     notes: str = ""
 
     part_of_speech: PartOfSpeech = attr.ib(
-        default=PartOfSpeech.UNKNOWN, converter=PartOfSpeech
+        default=PartOfSpeech.UNKNOWN, converter=_enum_converter(PartOfSpeech)
     )
-    gender: Gender = attr.ib(default=Gender.UNKNOWN, converter=Gender)
-    person: Person = attr.ib(default=Person.UNKNOWN, converter=Person)
-    tense: Tense = attr.ib(default=Tense.UNKNOWN, converter=Tense)
-    number: Number = attr.ib(default=Number.UNKNOWN, converter=Number)
+    gender: Gender = attr.ib(default=Gender.UNKNOWN, converter=_enum_converter(Gender))
+    person: Person = attr.ib(default=Person.UNKNOWN, converter=_enum_converter(Person))
+    tense: Tense = attr.ib(default=Tense.UNKNOWN, converter=_enum_converter(Tense))
+    number: Number = attr.ib(default=Number.UNKNOWN, converter=_enum_converter(Number))
 
     # The audio filename
     audio_filename: str = ""
@@ -63,34 +122,71 @@ class Word:
     # tags are metadata attached to a card to help organize.
     tags: list[str] = attr.ib(factory=list)
 
-    def __init__(self, **kwargs):
-        self._exists_in_anki: bool = False
-        self._google_sheet_cell: str = ""
+    # sync state, these are not read from the sheet.
+    _exists_in_anki: bool = attr.ib(default=False, init=False, eq=False, repr=False)
+    _google_sheet_cell: str = attr.ib(default="", init=False, eq=False, repr=False)
 
-        transformed_kwargs = {
-            key.lower().replace(" ", "_"): value for key, value in kwargs.items()
-        }
+    def __init__(self, **kwargs):
+        field_names = self.field_names()
 
-        cls_fields = {f.name for f in attr.fields(self.__class__)}
-        init_kwargs = {k: v for k, v in transformed_kwargs.items() if k in cls_fields}
+        init_kwargs = {}
+        for key, value in kwargs.items():
+            if key not in field_names:
+                key = key.lower().replace(" ", "_")
+                if key not in field_names:
+                    continue
+            init_kwargs[key] = value
 
         self.__attrs_init__(**init_kwargs)
 
     @classmethod
-    def from_sheets(cls, row: tuple[Hashable, pandas.Series]):
-        index, df = row
-        index = cast(int, index)
+    @functools.cache
+    def field_names(cls) -> frozenset[str]:
+        """Names of the fields that can be set from a sheet row."""
+        return frozenset(f.name for f in attr.fields(cls) if f.init)
 
-        data = df.to_dict()
-        data["guid"] = df.guid
+    @classmethod
+    def field_map(cls, header: Sequence[str]) -> FieldMap:
+        return cls._field_map(tuple(header))
 
-        obj = cls(**data)
-        obj.process_tags(df)
+    @classmethod
+    # one entry per sheet header seen, bounded for long running processes
+    @functools.lru_cache(maxsize=64)
+    def _field_map(cls, header: tuple[str, ...]) -> FieldMap:
+        return FieldMap.from_header(cls, header)
+
+    @classmethod
+    def from_values(cls, values: list[list[str]]) -> Iterator["Word"]:
+        """Build words from the raw sheet values, header row first."""
+        if not values:
+            return
+
+        field_map = cls.field_map(values[0])
+        for index, row in enumerate(values[1:]):
+            yield cls.from_row(field_map, index, row)
+
+    @classmethod
+    def from_row(cls, field_map: FieldMap, index: int, row: Sequence[str]):
+        row = field_map.pad(row)
+
+        # the field map only holds valid field names, skip the key clean up
+        # done by __init__.
+        obj = cls.__new__(cls)
+        obj.__attrs_init__(**{name: row[idx] for name, idx in field_map.fields})
+        obj.tags = [
+            sys.intern(str(row[idx])) for idx in field_map.tag_columns if row[idx]
+        ]
         obj.process_audio_filename()
 
         obj._google_sheet_cell = f"A{index+2}"
         return obj
 
+    @classmethod
+    def from_sheets(cls, row: tuple[Hashable, pandas.Series]):
+        index, df = row
+        field_map = cls.field_map(list(df.index))
+        return cls.from_row(field_map, cast(int, index), list(df.values))
+
     @classmethod
     def from_ankidb(cls, note: pandas.DataFrame):
         data = note.data
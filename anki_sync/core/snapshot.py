@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import pathlib
+from collections import Counter
+from typing import Any, Callable, Sequence
+
+import attr
+
+from anki_sync.config import get_config
+
+# Bump whenever the way a row is turned into a note changes so that old
+# snapshots are thrown away instead of reused.
+SNAPSHOT_VERSION = 2
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class SnapshotEntry:
+    """Everything needed to rebuild the note of an unchanged row."""
+
+    hash: str
+    fields: list[str]
+    tags: list[str]
+    phrase: str
+    audio_filename: str
+
+
+def snapshot_path(spreadsheet_id: str, sheet: str, note_class: type) -> pathlib.Path:
+    """Where the snapshot of `sheet` of a spreadsheet synced as `note_class` is kept."""
+    key = "\x1f".join(
+        [spreadsheet_id, sheet, f"{note_class.__module__}.{note_class.__qualname__}"]
+    )
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return get_config().cache_dir / "snapshots" / f"{digest}.jsonl"
+
+
+class SheetSnapshot:
+    """Local snapshot of the rows synced from a sheet, keyed by GUID.
+
+    Each entry holds a content hash of the row along with the note it produced.
+    On the next sync rows whose hash did not change can reuse their entry
+    instead of being rebuilt.
+
+    The snapshot is stored one row per line, `<hash>\\t<guid>\\t<entry>`, so
+    loading it only splits lines, an entry is decoded when its row turns out
+    unchanged and the line of a kept row is written back as it was read.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        # guid -> (row hash, line)
+        self.previous: dict[str, tuple[str, str]] = self._load()
+        self.current: dict[str, str] = {}
+        self.stats: Counter[str] = Counter()
+
+    @staticmethod
+    def row_hasher(columns: Sequence[str]) -> Callable[[Sequence[Any]], str]:
+        """Hash function for the rows of a sheet with the header `columns`.
+
+        The guid column is left out since it is written back to the sheet after
+        the first sync and should not make the row look changed. The header is
+        hashed once, and every row on top of it.
+        """
+        keep = [idx for idx, column in enumerate(columns) if column != "guid"]
+        header = hashlib.sha1(
+            "\x1f".join(columns[idx] for idx in keep).encode("utf-8") + b"\x1e"
+        )
+
+        def hash_row(values: Sequence[Any]) -> str:
+            digest = header.copy()
+            row = "\x1f".join(str(values[idx]) for idx in keep if idx < len(values))
+            digest.update(row.encode("utf-8"))
+            return digest.hexdigest()
+
+        return hash_row
+
+    @classmethod
+    def hash_row(cls, columns: Sequence[str], values: Sequence[Any]) -> str:
+        """Hash the content of a row, see `row_hasher`."""
+        return cls.row_hasher(columns)(values)
+
+    def lookup(self, guid: str, row_hash: str) -> SnapshotEntry | None:
+        """Get the entry of an unchanged row, None if the row is new or changed."""
+        previous = self.previous.get(guid) if guid else None
+        if previous is None:
+            self.stats["added"] += 1
+            return None
+        if previous[0] != row_hash:
+            self.stats["changed"] += 1
+            return None
+        self.stats["unchanged"] += 1
+        fields, tags, phrase, audio_filename = json.loads(previous[1].split("\t", 2)[2])
+        return SnapshotEntry(row_hash, fields, tags, phrase, audio_filename)
+
+    def keep(self, guid: str) -> None:
+        """Carry the entry of an unchanged row over as it was stored."""
+        self.current[guid] = self.previous[guid][1]
+
+    def record(self, guid: str, entry: SnapshotEntry) -> None:
+        data = [entry.fields, entry.tags, entry.phrase, entry.audio_filename]
+        self.current[guid] = "\t".join(
+            [entry.hash, json.dumps(guid), json.dumps(data, ensure_ascii=False)]
+        )
+
+    @property
+    def deleted(self) -> int:
+        """Rows of the stored snapshot that weren't seen during this run."""
+        return len(self.previous.keys() - self.current.keys())
+
+    def save(self) -> None:
+        """Replace the stored snapshot with the rows recorded during this run."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": SNAPSHOT_VERSION}) + "\n")
+            for line in self.current.values():
+                f.write(line + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> dict[str, tuple[str, str]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if not isinstance(header, dict):
+                    return {}
+                if header.get("version") != SNAPSHOT_VERSION:
+                    return {}
+                # not splitlines, entries may hold line separators such as U+2028
+                lines = f.read().split("\n")[:-1]
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+        previous = {}
+        try:
+            for line in lines:
+                row_hash, guid, _ = line.split("\t", 2)
+                previous[json.loads(guid)] = (row_hash, line)
+        except ValueError:
+            return {}
+        return previous
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import pathlib
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+
+import pandas as pd
+
+from anki_sync.config import get_config
+from anki_sync.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from anki_sync.core.gsheets import GoogleSheetsManager
+    from anki_sync.core.models.word import Word
+
+# Where the rows of a sheet are read from, see `load_values`.
+SOURCES = ("remote", "csv", "parquet", "cache")
+
+# Bump whenever the layout of a cached sheet changes.
+CACHE_VERSION = 2
+
+
+class SheetCache:
+    """Local copies of sheets, written by every read from Google Sheets.
+
+    Each sheet is stored column by column, a header name with the list of its
+    cells, which is smaller than row lists with their ragged trailing cells and
+    keeps every cell a string exactly as it came from the API.
+    """
+
+    def __init__(self, directory: Optional[pathlib.Path] = None):
+        self.directory = directory or get_config().cache_dir / "sheets"
+
+    def path(self, sheet: str) -> pathlib.Path:
+        return self.directory / f"{sheet}.json"
+
+    def save(
+        self, sheet: str, values: list[list[str]], revision: Optional[str] = None
+    ) -> pathlib.Path:
+        """Store the values of a sheet read at `revision` of the spreadsheet."""
+        header, rows = (values[0], values[1:]) if values else ([], [])
+        columns = [
+            [row[i] if i < len(row) else "" for row in rows] for i in range(len(header))
+        ]
+        data = {
+            "version": CACHE_VERSION,
+            "sheet": sheet,
+            "pulled_at": datetime.now(timezone.utc).isoformat(),
+            "revision": revision,
+            "rows": len(rows),
+            "header": header,
+            "columns": columns,
+        }
+
+        path = self.path(sheet)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, sheet: str) -> list[list[str]]:
+        path = self.path(sheet)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"{sheet} has not been pulled yet, run `anki-sync pull` first"
+            ) from None
+        except json.JSONDecodeError as e:
+            raise ValueError(f"cached copy of {sheet} is corrupt: {e}") from None
+
+        if data.get("version") != CACHE_VERSION:
+            raise ValueError(
+                f"cached copy of {sheet} is outdated, run `anki-sync pull` again"
+            )
+        return self._values(data)
+
+    def fresh(self, sheet: str, revision: str) -> Optional[list[list[str]]]:
+        """Values of the copy read at `revision`, None if there's no such copy."""
+        try:
+            with open(self.path(sheet), encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if data.get("version") != CACHE_VERSION or data.get("revision") != revision:
+            return None
+        return self._values(data)
+
+    @staticmethod
+    def _values(data: dict) -> list[list[str]]:
+        if not data["header"]:
+            return []
+        return [data["header"], *(list(row) for row in zip(*data["columns"]))]
+
+
+def load_values(
+    sheet: str,
+    source: str = "remote",
+    gsheets: Optional["GoogleSheetsManager"] = None,
+    directory: Optional[pathlib.Path] = None,
+    note_class: Optional[type["Word"]] = None,
+) -> list[list[str]]:
+    """Get the cell values of a sheet, header row first, from `source`.
+
+    remote  -- the Google Sheet itself
+    csv     -- `<directory>/<sheet>.csv`
+    parquet -- `<directory>/<sheet>.parquet`, needs pyarrow or fastparquet
+    cache   -- the copy made by the last `anki-sync pull` or remote sync
+
+    `directory` defaults to the configured source_dir. Every cell is returned as
+    a string, the same as the Sheets API returns them. Remote sheets are limited
+    to the columns of `note_class` when it's given.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"unknown source {source!r}, expected one of {SOURCES}")
+
+    with metrics.timer(f"source.{source}"):
+        if source == "remote":
+            if gsheets is None:
+                raise ValueError(f"{sheet} is read remotely but Sheets isn't set up")
+            return gsheets.get_values(sheet, note_class)
+        if source == "cache":
+            return SheetCache().load(sheet)
+
+        path = (directory or get_config().source_dir) / f"{sheet}.{source}"
+        if not path.exists():
+            raise FileNotFoundError(f"file not found: {path.resolve()}")
+        if source == "csv":
+            return _read_csv(path)
+        return _read_parquet(path)
+
+
+def _read_csv(path: pathlib.Path) -> list[list[str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        values = list(csv.reader(f))
+    # DataFrame.to_csv, as used by scripts/process.py, writes an unnamed index
+    if values and values[0] and values[0][0] == "":
+        values = [row[1:] for row in values]
+    return values
+
+
+def _read_parquet(path: pathlib.Path) -> list[list[str]]:
+    try:
+        data = pd.read_parquet(path)
+    except ImportError as e:
+        raise ImportError(
+            f"reading {path.name} needs a parquet engine, pip install pyarrow: {e}"
+        ) from None
+
+    data = data.fillna("").astype(str)
+    return [list(data.columns), *data.values.tolist()]
@@ -1,11 +1,49 @@
+import contextlib
 import itertools
+import os
 import pathlib
 import sqlite3
+import tempfile
+import threading
 import time
+from collections import defaultdict
 from enum import Enum
+from typing import Any, Iterable, Iterator, Mapping, Sequence
 
 import pandas as pd
 
+from anki_sync.config import get_config
+from anki_sync.utils.metrics import metrics
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older sqlite builds (999).
+MAX_QUERY_PARAMS = 900
+
+# Prepared statements kept per connection (sqlite3 defaults to 128) and rows
+# pulled per fetchmany when streaming.
+STATEMENT_CACHE_SIZE = 512
+STREAM_SIZE = 1000
+
+Params = Sequence[Any] | Mapping[str, Any]
+
+# Copy the history of the notes listed in temp.history_notes from the attached
+# collection, moving the cards to the package's deck.
+COPY_CARDS = """
+INSERT INTO main.cards
+SELECT id, nid, :did, ord, mod, usn, type, queue, due, ivl, factor, reps, lapses,
+       left, odue, odid, flags, data
+FROM old.cards
+WHERE nid IN (SELECT id FROM temp.history_notes)
+ORDER BY nid, ord
+"""
+COPY_REVLOG = """
+INSERT INTO main.revlog
+SELECT id, cid, usn, ease, ivl, lastIvl, factor, time, type
+FROM old.revlog
+WHERE cid IN (
+    SELECT id FROM old.cards WHERE nid IN (SELECT id FROM temp.history_notes)
+)
+"""
+
 
 class Table(Enum):
     NOTES = "notes"
@@ -14,33 +52,81 @@ class Table(Enum):
 
 
 class AnkiDatabase:
+    """Read-only view of an Anki collection.
+
+    The collection is opened with a `mode=ro` URI and `query_only`, and every query
+    of the run happens inside one read transaction so they all see the same state
+    of the collection. Holding that transaction can still keep Anki from writing
+    to a collection in rollback journal mode, with `snapshot` the collection is
+    first copied to a temp file with the sqlite backup API and the copy is read
+    instead.
+    """
 
-    def __init__(self, path: pathlib.Path):
+    def __init__(self, path: pathlib.Path, snapshot: bool = False):
         self.path = path
+        self.snapshot = snapshot
+        # the database actually being read, the temp copy when snapshotting
+        self.read_path: pathlib.Path = path
         self.conn: sqlite3.Connection | None = None
         self.id_gen = itertools.count(int(time.time() * 1000))
+        self._guid_index: dict[str, int] | None = None
+        self._cards_by_note: dict[int, list[sqlite3.Row]] | None = None
+        self._revlog_by_card: dict[int, list[sqlite3.Row]] | None = None
+        self._lock = threading.Lock()
 
         if self.path.is_file() is False:
             raise FileNotFoundError(f"file not found: {self.path.resolve()}")
 
-        self.conn = sqlite3.connect(self.path.resolve())
+        self.conn = self._connect()
 
     def __enter__(self) -> "AnkiDatabase":
         if self.conn is None:
-            self.conn = sqlite3.connect(self.path.resolve())
+            self.conn = self._connect()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.conn:
-            if exc_type:
-                self.conn.rollback()
-            else:
-                self.conn.commit()
-            self.close()
+        self.close()
 
     def close(self):
         if self.conn:
+            # nothing was written, this only ends the read transaction
+            self.conn.rollback()
             self.conn.close()
+            self.conn = None
+        if self.read_path is not self.path:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.read_path)
+            self.read_path = self.path
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.snapshot:
+            self.read_path = self._snapshot()
+
+        conn = sqlite3.connect(
+            _read_only_uri(self.read_path),
+            uri=True,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            # decks are built concurrently and share the read transaction
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("BEGIN")
+        return conn
+
+    @metrics.timed("sql.snapshot")
+    def _snapshot(self) -> pathlib.Path:
+        """Copy the collection to a temp file with the sqlite backup API."""
+        fd, snapshot_path = tempfile.mkstemp(prefix="collection-", suffix=".anki2")
+        os.close(fd)
+
+        source = sqlite3.connect(_read_only_uri(self.path), uri=True)
+        target = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        return pathlib.Path(snapshot_path)
 
     def get_notes(self) -> pd.DataFrame:
         return self._get_table(Table.NOTES)
@@ -59,6 +145,30 @@ class AnkiDatabase:
         query = "SELECT * FROM revlog WHERE cid = ?"
         return self.execute(query, (card_id,))
 
+    def iter_notes(
+        self,
+        columns: Sequence[str] | None = None,
+        chunk_size: int | None = None,
+        downcast: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        return self._iter_table(Table.NOTES, columns, chunk_size, downcast)
+
+    def iter_cards(
+        self,
+        columns: Sequence[str] | None = None,
+        chunk_size: int | None = None,
+        downcast: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        return self._iter_table(Table.CARDS, columns, chunk_size, downcast)
+
+    def iter_revlog(
+        self,
+        columns: Sequence[str] | None = None,
+        chunk_size: int | None = None,
+        downcast: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        return self._iter_table(Table.REVLOG, columns, chunk_size, downcast)
+
     def get_note_id_by_guid(self, guid: str) -> tuple[int, bool]:
         """Will get the note id by guid.  If there is no note then we will generate one
         otherwise we'll return the existing note id.
@@ -69,12 +179,138 @@ class AnkiDatabase:
         if guid == "":
             return next(self.id_gen), False
 
-        query = "SELECT id FROM notes WHERE guid = ?"
-        row = self.execute(query, (guid,))
-        if len(row) == 0:
+        note_id = self.load_guid_index().get(guid)
+        if note_id is None:
             return next(self.id_gen), False
         else:
-            return row["id"].item(), True
+            return note_id, True
+
+    @metrics.timed("sql.load_guid_index")
+    def load_guid_index(self) -> dict[str, int]:
+        """Will load the guid -> note id index for the whole collection.
+
+        The index is built with a single query on first use and reused for the rest of
+        the run so every lookup in `get_note_id_by_guid` is a dict hit.
+        """
+        if self._guid_index is None:
+            self._guid_index = dict(self.stream("SELECT guid, id FROM notes"))
+        return self._guid_index
+
+    @metrics.timed("sql.prefetch_history")
+    def prefetch_history(self, note_ids: Iterable[int]) -> None:
+        """Will load every card of the given notes and every revlog entry of those
+        cards with a handful of chunked `IN (...)` queries.
+
+        The rows are grouped in memory by note id and card id so that writing the
+        package never has to go back to the old database. Every deck prefetches the
+        history of its own notes, the results of each call are merged.
+        """
+        cards_by_note: dict[int, list[sqlite3.Row]] = defaultdict(list)
+        revlog_by_card: dict[int, list[sqlite3.Row]] = defaultdict(list)
+
+        card_ids = []
+        for chunk in _chunks(sorted(set(note_ids)), MAX_QUERY_PARAMS):
+            query = (
+                f"SELECT * FROM cards WHERE nid IN ({_placeholders(chunk)}) "
+                "ORDER BY nid, ord"
+            )
+            for row in self.stream(query, chunk, named=True):
+                cards_by_note[row["nid"]].append(row)
+                card_ids.append(row["id"])
+
+        for chunk in _chunks(card_ids, MAX_QUERY_PARAMS):
+            query = f"SELECT * FROM revlog WHERE cid IN ({_placeholders(chunk)})"
+            for row in self.stream(query, chunk, named=True):
+                revlog_by_card[row["cid"]].append(row)
+
+        with self._lock:
+            self._cards_by_note = {**(self._cards_by_note or {}), **cards_by_note}
+            self._revlog_by_card = {**(self._revlog_by_card or {}), **revlog_by_card}
+        metrics.count("sql.cards_prefetched", len(card_ids))
+        metrics.count("sql.revlog_prefetched", sum(map(len, revlog_by_card.values())))
+
+    @property
+    def history_prefetched(self) -> bool:
+        return self._cards_by_note is not None
+
+    @metrics.timed("sql.copy_history")
+    def copy_history(
+        self, cursor: sqlite3.Cursor, note_ids: Iterable[int], deck_id: int
+    ) -> None:
+        """Will copy the cards of the given notes and their revlog into the database of
+        `cursor`, moving the cards to `deck_id`.
+
+        The collection is attached read-only and the rows are copied with set based
+        `INSERT ... SELECT` statements, so no history row passes through Python.
+        The attached database is `read_path`, when snapshotting the history comes
+        from the same copy as every other query.
+        """
+        conn = cursor.connection
+        cursor.execute("ATTACH DATABASE ? AS old", (_read_only_uri(self.read_path),))
+        try:
+            cursor.execute("CREATE TEMP TABLE history_notes (id INTEGER PRIMARY KEY)")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO temp.history_notes VALUES (?)",
+                ((note_id,) for note_id in note_ids),
+            )
+            cards = cursor.execute(COPY_CARDS, {"did": deck_id}).rowcount
+            revlog = cursor.execute(COPY_REVLOG).rowcount
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS temp.history_notes")
+            cursor.execute("DETACH DATABASE old")
+
+        metrics.count("sql.cards_copied", cards)
+        metrics.count("sql.revlog_copied", revlog)
+
+    def get_prefetched_cards(self, note_id: int) -> list[sqlite3.Row]:
+        if self._cards_by_note is None:
+            raise RuntimeError("prefetch_history must be called before reading cards")
+        return self._cards_by_note.get(note_id, [])
+
+    def get_prefetched_revlog(self, card_id: int) -> list[sqlite3.Row]:
+        if self._revlog_by_card is None:
+            raise RuntimeError("prefetch_history must be called before reading revlog")
+        return self._revlog_by_card.get(card_id, [])
+
+    def query(self, query: str, params: Params = (), named: bool = False) -> list:
+        """Run a query and return every row as a tuple, or a sqlite3.Row when `named`.
+
+        Unlike `execute` nothing goes through pandas, use this for anything on the
+        sync path.
+        """
+        return self._cursor(named).execute(query, params).fetchall()
+
+    def query_one(self, query: str, params: Params = (), named: bool = False):
+        """First row of a query, None if there is none."""
+        return self._cursor(named).execute(query, params).fetchone()
+
+    def scalar(self, query: str, params: Params = ()) -> Any:
+        """First column of the first row of a query, None if there is no row."""
+        row = self.query_one(query, params)
+        return row[0] if row is not None else None
+
+    def stream(
+        self,
+        query: str,
+        params: Params = (),
+        named: bool = False,
+        size: int = STREAM_SIZE,
+    ) -> Iterator:
+        """Iterate over the rows of a big query `size` rows at a time."""
+        cursor = self._cursor(named).execute(query, params)
+        cursor.arraysize = size
+        while rows := cursor.fetchmany():
+            yield from rows
+
+    def _cursor(self, named: bool) -> sqlite3.Cursor:
+        cursor = self.conn.cursor()
+        if named:
+            cursor.row_factory = sqlite3.Row
+        return cursor
 
     def _get_table(self, table: Table) -> pd.DataFrame:
         query = f"SELECT * FROM {table.value}"
@@ -82,5 +318,60 @@ class AnkiDatabase:
         notes.set_index("id", inplace=True)
         return notes
 
+    def _iter_table(
+        self,
+        table: Table,
+        columns: Sequence[str] | None = None,
+        chunk_size: int | None = None,
+        downcast: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        """Will walk a whole table in DataFrames of `chunk_size` rows, indexed by id.
+
+        Only the given columns are read, and with `downcast` numeric columns are
+        shrunk to the smallest dtype that holds the values of each chunk, so memory
+        stays bounded by the chunk rather than the table.
+        """
+        known = [row[1] for row in self.query(f"PRAGMA table_info({table.value})")]
+        if columns is None:
+            columns = known
+        unknown = set(columns) - set(known)
+        if unknown:
+            raise ValueError(
+                f"unknown {table.value} columns: {', '.join(sorted(unknown))}"
+            )
+
+        columns = ["id", *(c for c in columns if c != "id")]
+        query = f"SELECT {', '.join(columns)} FROM {table.value} ORDER BY id"
+        for chunk in pd.read_sql(
+            query,
+            self.conn,
+            index_col="id",
+            chunksize=chunk_size or get_config().chunk_size,
+        ):
+            yield _downcast(chunk) if downcast else chunk
+
+    @metrics.timed("sql.execute")
     def execute(self, query, params=None) -> pd.DataFrame:
+        """Run a query into a DataFrame, meant for analysis rather than syncing."""
         return pd.read_sql(query, self.conn, params=params)
+
+
+def _chunks(values: list, size: int) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _placeholders(values: list) -> str:
+    return ",".join("?" * len(values))
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    for column in df.select_dtypes("integer").columns:
+        df[column] = pd.to_numeric(df[column], downcast="integer")
+    for column in df.select_dtypes("float").columns:
+        df[column] = pd.to_numeric(df[column], downcast="float")
+    return df
+
+
+def _read_only_uri(path: pathlib.Path) -> str:
+    return f"{pathlib.Path(path.resolve()).as_uri()}?mode=ro"
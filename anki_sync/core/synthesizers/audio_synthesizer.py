@@ -1,11 +1,55 @@
+import asyncio
 import os
 import pathlib
-from typing import Literal, Optional
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, Literal, Optional
+
+import attr
+
+from anki_sync.config import get_config
+from anki_sync.utils.metrics import metrics
 
 from .base import BaseSynthesizer
+from .batch import synthesize_batch
+from .cache import AudioCache, CacheKey
 from .elevenlabs import ElevenLabsSynthesizer
 from .google import GoogleSynthesizer
 
+# Synthesizer implementation per provider name, unknown names fall back to
+# Google.
+SYNTHESIZERS: dict[str, type[BaseSynthesizer]] = {
+    "elevenlabs": ElevenLabsSynthesizer,
+    "google": GoogleSynthesizer,
+}
+
+# Upper bound of concurrent requests per provider, shared by every
+# AudioSynthesizer in the process.  The effective limit is also capped by
+# Config.max_workers.
+PROVIDER_CONCURRENCY = {
+    "elevenlabs": 2,
+    "google": 4,
+}
+
+_provider_slots: dict[str, threading.BoundedSemaphore] = {}
+_provider_slots_lock = threading.Lock()
+
+
+def _get_provider_slots(provider: str, max_workers: int) -> threading.BoundedSemaphore:
+    with _provider_slots_lock:
+        if provider not in _provider_slots:
+            limit = min(max_workers, PROVIDER_CONCURRENCY.get(provider, 1))
+            _provider_slots[provider] = threading.BoundedSemaphore(limit)
+        return _provider_slots[provider]
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class AudioMeta:
+
+    phrase: str
+    filename: str
+
 
 class AudioSynthesizer:
     """Handles audio synthesis for words.
@@ -13,25 +57,100 @@ class AudioSynthesizer:
     This class manages the synthesis of audio files for words, using either
     ElevenLabs or Google Cloud TTS as the backend synthesizer. It tracks
     statistics about the synthesis process and handles file management.
+
+    Jobs queued with `submit` are synthesized by a bounded thread pool so the
+    caller can keep building notes; `join` waits for the queue to drain and
+    prints what the jobs reported.
+
+    Audio is synthesized into the shared AudioCache and linked into the output
+    directory. A media file is only considered up to date when the cache index
+    says it was made with the current provider, voice and model; otherwise it
+    is replaced from the cache, or resynthesized on a miss.
     """
 
     def __init__(
         self,
         output_directory: pathlib.Path,
         synthesizer_type: Literal["elevenlabs", "google"] = "elevenlabs",
+        max_workers: Optional[int] = None,
+        cache: Optional[AudioCache] = None,
     ):
         """Initialize the audio synthesizer.
 
         Args:
             output_directory: Directory where sound files will be stored
             synthesizer_type: Type of synthesizer to use ("elevenlabs" or "google")
+            max_workers: Size of the synthesis pool, defaults to Config.max_workers
+            cache: Audio cache to use, defaults to the one under Config.cache_dir
         """
         self.output_directory = output_directory
-        self.synthesizer: BaseSynthesizer = (
-            ElevenLabsSynthesizer()
-            if synthesizer_type == "elevenlabs"
-            else GoogleSynthesizer()
+        self.synthesizer_type = synthesizer_type
+        self.synthesizer: BaseSynthesizer = SYNTHESIZERS.get(
+            synthesizer_type, GoogleSynthesizer
+        )()
+
+        max_workers = max_workers or get_config().max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="audio"
         )
+        self._provider_slots = _get_provider_slots(synthesizer_type, max_workers)
+        # One future per phrase so the same phrase is never synthesized twice
+        # or by two workers at the same time.
+        self._jobs: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats: Counter[str] = Counter()
+        # what the workers have to say, printed by the thread that joins them so
+        # it doesn't interleave with the decks' output
+        self._messages: list[str] = []
+        self._media_files: set[str] = self._scan_media()
+
+        self.cache = cache or AudioCache(get_config().cache_dir / "audio")
+        self._media_keys: dict[str, str] = (
+            self.cache.media_keys(output_directory) if output_directory else {}
+        )
+        # media records are written in one go by `join`
+        self._new_media: list[tuple[str, CacheKey]] = []
+
+    def _scan_media(self) -> set[str]:
+        """Index the names of every file in the output directory with one scan."""
+        if not self.output_directory:
+            return set()
+        try:
+            with os.scandir(self.output_directory) as entries:
+                return {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            return set()
+
+    @property
+    def media_files(self) -> Optional[frozenset[str]]:
+        """Files in the output directory as scanned, plus the ones installed since.
+
+        None without an output directory, when nothing was scanned.
+        """
+        if not self.output_directory:
+            return None
+        with self._lock:
+            return frozenset(self._media_files)
+
+    def media_exists(self, audio_filename: str) -> bool:
+        """Check the media index instead of stat-ing the file."""
+        self.stats["stats_saved"] += 1
+        return audio_filename in self._media_files
+
+    def is_current(self, audio_filename: str, key: CacheKey) -> bool:
+        """Whether the media file exists and was made from `key`."""
+        if not self.media_exists(audio_filename):
+            return False
+
+        recorded = self._media_keys.get(audio_filename)
+        if recorded is None:
+            # Files synced before the cache existed, trust that they were made
+            # with the current settings rather than resynthesizing everything.
+            self.cache.adopt(key, self._media_path(audio_filename))
+            self._record(audio_filename, key)
+            self.stats["adopted"] += 1
+            return True
+        return recorded == key.digest
 
     def generate_sound_filename(self, word: str) -> Optional[str]:
         """Generates the sound filename for a word.
@@ -46,6 +165,7 @@ class AudioSynthesizer:
             return f"{word}.mp3"
         return None
 
+    @metrics.timed("audio.synthesize_if_needed")
     def synthesize_if_needed(self, phrase: str, audio_filename: str) -> None:
         """Synthesizes audio for a word if it doesn't exist.
 
@@ -54,16 +174,161 @@ class AudioSynthesizer:
             audio_filename: The filename to save the audio as
 
         This method will:
-        1. Check if the audio file already exists
-        2. If not, synthesize it using the configured synthesizer
+        1. Check if the audio file already exists and is up to date
+        2. If not, copy it from the cache or synthesize it using the configured
+           synthesizer
         """
         if not (phrase and audio_filename and self.output_directory):
             return
 
-        full_sound_path = os.path.join(self.output_directory, audio_filename)
-        if not os.path.exists(full_sound_path):
-            try:
-                self.synthesizer.synthesize(phrase, full_sound_path)
-                print(f"generating new audio {phrase}")
-            except Exception:
-                print(f"failed to generate new audio for {phrase}")
+        key = self.synthesizer.cache_key(phrase)
+        with self._lock:
+            if self.is_current(audio_filename, key):
+                return
+        self._synthesize(phrase, audio_filename, key)
+
+    def submit(self, audio: AudioMeta) -> Optional[Future]:
+        """Queue audio synthesis for a word if its file doesn't exist.
+
+        Args:
+            audio: The phrase and filename to synthesize
+
+        Returns:
+            The future of the synthesis job, None if nothing needs to be done.
+            Submitting a phrase that is already queued returns the existing job.
+        """
+        if not (audio.phrase and audio.filename and self.output_directory):
+            return None
+
+        with self._lock:
+            if audio.phrase in self._jobs:
+                self.stats["duplicate"] += 1
+                return self._jobs[audio.phrase]
+
+            key = self.synthesizer.cache_key(audio.phrase)
+            if self.is_current(audio.filename, key):
+                self.stats["exists"] += 1
+                return None
+
+            future = self._executor.submit(
+                self._synthesize, audio.phrase, audio.filename, key
+            )
+            self._jobs[audio.phrase] = future
+            return future
+
+    def join(self) -> Counter[str]:
+        """Wait for every queued job to finish and return the run summary."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        wait(jobs)
+        self._executor.shutdown()
+        self._flush_cache()
+        self._print_messages()
+        for key, value in self.stats.items():
+            metrics.count(f"audio.{key}", value)
+        return self.stats
+
+    def backfill(self, audio: Iterable[AudioMeta]) -> Counter[str]:
+        """Synthesize every missing audio file concurrently with the async clients.
+
+        Meant for large backfills, requests are only bounded by the provider's
+        concurrency limit instead of the worker pool.
+
+        Args:
+            audio: The phrases and filenames that should have audio
+        """
+        jobs: dict[str, tuple[str, CacheKey]] = {}
+        for meta in audio:
+            if not (meta.phrase and meta.filename):
+                continue
+            key = self.synthesizer.cache_key(meta.phrase)
+            if meta.phrase in jobs:
+                self.stats["duplicate"] += 1
+            elif self.is_current(meta.filename, key):
+                self.stats["exists"] += 1
+            else:
+                jobs[meta.phrase] = (meta.filename, key)
+
+        misses = {
+            phrase: key
+            for phrase, (_, key) in jobs.items()
+            if not self.cache.contains(key)
+        }
+        concurrency = PROVIDER_CONCURRENCY.get(self.synthesizer_type, 1)
+        with metrics.timer("audio.backfill"):
+            asyncio.run(
+                synthesize_batch(
+                    self.synthesizer,
+                    [
+                        (phrase, str(self.cache.reserve(key)))
+                        for phrase, key in misses.items()
+                    ],
+                    concurrency,
+                )
+            )
+
+        for phrase, (filename, key) in jobs.items():
+            self._install(phrase, filename, key, cached=phrase not in misses)
+        self._flush_cache()
+        self._print_messages()
+        return self.stats
+
+    def _synthesize(self, phrase: str, audio_filename: str, key: CacheKey) -> None:
+        cached = self.cache.contains(key)
+        if not cached:
+            with self._provider_slots, metrics.timer("audio.synthesize"):
+                try:
+                    self.synthesizer.synthesize(phrase, str(self.cache.reserve(key)))
+                except Exception as e:
+                    self._failed(phrase, e)
+                    return
+        self._install(phrase, audio_filename, key, cached)
+
+    def _install(
+        self, phrase: str, audio_filename: str, key: CacheKey, cached: bool
+    ) -> None:
+        """Link the cached audio of `key` into the output directory."""
+        if not self.cache.contains(key):
+            self._failed(phrase)
+            return
+
+        try:
+            self.cache.materialize(key, self._media_path(audio_filename))
+        except OSError as e:
+            self._failed(phrase, e)
+            return
+        with self._lock:
+            self._media_files.add(audio_filename)
+            self._record(audio_filename, key)
+            if cached:
+                self.stats["cached"] += 1
+            else:
+                self.stats["generated"] += 1
+                self._messages.append(f"generated new audio {phrase}")
+
+    def _failed(self, phrase: str, error: Optional[BaseException] = None) -> None:
+        message = f"failed to generate new audio for {phrase}"
+        if error is not None:
+            message += f": {error!r}"
+        with self._lock:
+            self.stats["failed"] += 1
+            self._messages.append(message)
+
+    def _print_messages(self) -> None:
+        with self._lock:
+            messages, self._messages = self._messages, []
+        for message in messages:
+            print(message)
+
+    def _record(self, audio_filename: str, key: CacheKey) -> None:
+        self._media_keys[audio_filename] = key.digest
+        self._new_media.append((audio_filename, key))
+
+    def _flush_cache(self) -> None:
+        with self._lock:
+            new_media, self._new_media = self._new_media, []
+        self.cache.index(key for _, key in new_media)
+        self.cache.record_media(self.output_directory, new_media)
+
+    def _media_path(self, audio_filename: str) -> pathlib.Path:
+        return pathlib.Path(self.output_directory, audio_filename)
@@ -1,4 +1,42 @@
+import asyncio
+import contextlib
+import os
+import tempfile
 from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator
+
+from anki_sync.utils.retry import RetryScheduler, get_scheduler
+
+from .cache import CacheKey
+
+# Read once at import: os.umask can only be read by setting it, which would race
+# with the worker threads creating files.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str) -> Iterator[BinaryIO]:
+    """Write a file through a temporary sibling that is renamed into place.
+
+    The temporary file lives in the same directory so the final `os.replace` is
+    atomic. If the block raises the temporary file is removed, so a partially
+    written file never shows up under `path`. The file gets the mode `open`
+    would have given it rather than mkstemp's owner-only 0600.
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{filename}.", suffix=".part"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
 
 
 class BaseSynthesizer(ABC):
@@ -9,6 +47,22 @@ class BaseSynthesizer(ABC):
     saving the audio file to the specified directory.
     """
 
+    # Name of the remote service, synthesizers of the same provider share its
+    # rate limit.
+    provider: str = "local"
+
+    @property
+    def scheduler(self) -> RetryScheduler:
+        return get_scheduler(self.provider)
+
+    def cache_key(self, text: str) -> CacheKey:
+        """Key of the audio this synthesizer produces for `text`.
+
+        Implementations include their voice and model so changing either one
+        never reuses audio made with the old settings.
+        """
+        return CacheKey(self.provider, "", "", text)
+
     @abstractmethod
     def synthesize(self, text: str, output_directory: str) -> None:
         """Synthesize text to speech and save to the output directory.
@@ -17,3 +71,15 @@ class BaseSynthesizer(ABC):
             text: The text to synthesize into speech
             output_directory: Directory where the audio file will be saved
         """
+
+    async def asynthesize(self, text: str, output_filename: str) -> None:
+        """Asynchronous variant of `synthesize`.
+
+        Providers with an async client override this, the default runs the
+        blocking `synthesize` in a worker thread.
+
+        Args:
+            text: The text to synthesize into speech
+            output_filename: Where the audio file will be saved
+        """
+        await asyncio.to_thread(self.synthesize, text, output_filename)
@@ -0,0 +1,29 @@
+import asyncio
+from typing import Iterable
+
+from .base import BaseSynthesizer
+
+
+async def synthesize_batch(
+    synthesizer: BaseSynthesizer,
+    jobs: Iterable[tuple[str, str]],
+    concurrency: int,
+) -> list[BaseException | None]:
+    """Synthesize a batch of (text, output filename) jobs concurrently.
+
+    At most `concurrency` requests are in flight at any time, all of them
+    sharing the synthesizer's async client.
+
+    Returns:
+        One entry per job, the exception it raised or None on success
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(text: str, output_filename: str) -> None:
+        async with semaphore:
+            await synthesizer.asynthesize(text, output_filename)
+
+    return await asyncio.gather(
+        *(run(text, output_filename) for text, output_filename in jobs),
+        return_exceptions=True,
+    )
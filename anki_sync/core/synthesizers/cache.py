@@ -0,0 +1,150 @@
+import contextlib
+import hashlib
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Iterable
+
+import attr
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    voice TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    directory TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (directory, filename)
+);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Texts that only differ in unicode form or whitespace sound the same."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class CacheKey:
+    """Everything that decides what the synthesized audio of a text sounds like."""
+
+    provider: str
+    voice: str
+    model: str
+    text: str = attr.ib(converter=normalize_text)
+    digest: str = attr.ib(init=False)
+
+    @digest.default
+    def _digest(self) -> str:
+        data = "\x1f".join((self.provider, self.voice, self.model, self.text))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Content addressed store of synthesized audio, shared by every deck.
+
+    Blobs live under `<directory>/<2 hex chars>/<digest>.mp3` and are indexed in
+    an SQLite database next to them. The index also remembers which key every
+    media file was produced from, so a media file made with another voice or
+    provider is recognised as stale even though its name did not change.
+    """
+
+    def __init__(self, directory: pathlib.Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            directory / "index.sqlite", check_same_thread=False
+        )
+        self._conn.executescript(CACHE_SCHEMA)
+        self._lock = threading.Lock()
+
+    def path(self, key: CacheKey) -> pathlib.Path:
+        return self.directory / key.digest[:2] / f"{key.digest}.mp3"
+
+    def contains(self, key: CacheKey) -> bool:
+        # blobs are written through atomic_write, a blob that exists is complete
+        return self.path(key).exists()
+
+    def reserve(self, key: CacheKey) -> pathlib.Path:
+        """Path a synthesizer should write the audio of `key` to."""
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        return path
+
+    def adopt(self, key: CacheKey, source: pathlib.Path) -> None:
+        """Take an existing audio file into the cache under `key`."""
+        path = self.reserve(key)
+        if not path.exists():
+            link_or_copy(source, path)
+
+    def materialize(self, key: CacheKey, target: pathlib.Path) -> None:
+        """Hardlink the cached audio to `target`, copying across file systems."""
+        link_or_copy(self.path(key), target)
+
+    def index(self, keys: Iterable[CacheKey]) -> None:
+        """Record the metadata of new blobs, known ones keep their entry."""
+        rows = []
+        now = int(time.time())
+        for key in keys:
+            with contextlib.suppress(FileNotFoundError):
+                size = self.path(key).stat().st_size
+                rows.append(
+                    (
+                        key.digest,
+                        key.provider,
+                        key.voice,
+                        key.model,
+                        key.text,
+                        size,
+                        now,
+                    )
+                )
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO audio VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def media_keys(self, directory: pathlib.Path) -> dict[str, str]:
+        """Digest every media file of `directory` was produced from."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename, key FROM media WHERE directory = ?",
+                (str(directory),),
+            ).fetchall()
+        return dict(rows)
+
+    def record_media(
+        self, directory: pathlib.Path, media: Iterable[tuple[str, CacheKey]]
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?)",
+                ((str(directory), name, key.digest) for name, key in media),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def link_or_copy(source: pathlib.Path, target: pathlib.Path) -> None:
+    """Atomically replace `target` with a hardlink of `source`, or a copy of it."""
+    tmp_path = target.with_name(f".{target.name}.link")
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
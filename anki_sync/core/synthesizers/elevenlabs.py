@@ -1,8 +1,10 @@
+import asyncio
 import os
 
-from elevenlabs.client import ElevenLabs
+from elevenlabs.client import AsyncElevenLabs, ElevenLabs
 
-from .base import BaseSynthesizer
+from .base import BaseSynthesizer, atomic_write
+from .cache import CacheKey
 
 
 class ElevenLabsSynthesizer(BaseSynthesizer):
@@ -12,14 +14,28 @@ class ElevenLabsSynthesizer(BaseSynthesizer):
     Requires an ELEVENLABS_API_KEY environment variable to be set.
     """
 
+    provider = "elevenlabs"
+    voice_id = "2Lb1en5ujrODDIqmp7F3"
+    model_id = "eleven_multilingual_v2"
+    output_format = "mp3_44100_128"
+
     def __init__(self):
         """Initialize the ElevenLabs synthesizer.
 
         Creates a new ElevenLabs client using the API key from environment variables.
+        The async client is created on first use and shared by every `asynthesize`
+        call running on the same event loop so its connection pool is reused.
         """
         self.client = ElevenLabs(
             api_key=os.getenv("ELEVENLABS_API_KEY"),
         )
+        self._async_client: AsyncElevenLabs | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
+    def cache_key(self, text: str) -> CacheKey:
+        return CacheKey(
+            self.provider, self.voice_id, f"{self.model_id}/{self.output_format}", text
+        )
 
     def synthesize(self, text: str, output_filename: str) -> None:
         """Synthesize text to speech using ElevenLabs.
@@ -30,27 +46,59 @@ class ElevenLabsSynthesizer(BaseSynthesizer):
 
         The audio file will be saved as {text}.mp3 in the output directory.
         Uses the multilingual v2 model with a standard Greek voice.
+        Rate limited and transient errors are retried by the provider's scheduler.
         """
-
-        voice_id = "2Lb1en5ujrODDIqmp7F3"
-        model_id = "eleven_multilingual_v2"
-
         try:
-            audio_stream = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=voice_id,
-                model_id=model_id,
-                output_format="mp3_44100_128",
-            )
+            self.scheduler.call(self._convert, text, output_filename)
+        except Exception as e:
+            print(f"Error synthesizing '{text}': {e}")
 
-            # Collect all audio chunks from the generator
-            full_audio_bytes = b""  # Initialize an empty bytes object
+    def _convert(self, text: str, output_filename: str) -> None:
+        audio_stream = self.client.text_to_speech.convert(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+            output_format=self.output_format,
+        )
+
+        # Stream the chunks to disk, the file only appears under its final
+        # name once the whole stream has been received.
+        with atomic_write(output_filename) as f:
             for chunk in audio_stream:
                 if chunk:  # Ensure chunk is not empty
-                    full_audio_bytes += chunk
+                    f.write(chunk)
+
+    async def asynthesize(self, text: str, output_filename: str) -> None:
+        """Synthesize text to speech using the async ElevenLabs client.
 
-            # Write the collected bytes to the file
-            with open(output_filename, "wb") as f:
-                f.write(full_audio_bytes)
+        Args:
+            text: The text to synthesize into speech
+            output_filename: Where the audio file will be saved
+        """
+        try:
+            await self.scheduler.acall(self._aconvert, text, output_filename)
         except Exception as e:
             print(f"Error synthesizing '{text}': {e}")
+
+    async def _aconvert(self, text: str, output_filename: str) -> None:
+        audio_stream = self._get_async_client().text_to_speech.convert(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+            output_format=self.output_format,
+        )
+
+        with atomic_write(output_filename) as f:
+            async for chunk in audio_stream:
+                if chunk:
+                    f.write(chunk)
+
+    def _get_async_client(self) -> AsyncElevenLabs:
+        # httpx connections are bound to the loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = AsyncElevenLabs(
+                api_key=os.getenv("ELEVENLABS_API_KEY"),
+            )
+            self._async_loop = loop
+        return self._async_client
@@ -1,7 +1,10 @@
+import asyncio
+
 from google.cloud import texttospeech
 from google.cloud.texttospeech_v1.types import SynthesizeSpeechResponse
 
-from .base import BaseSynthesizer
+from .base import BaseSynthesizer, atomic_write
+from .cache import CacheKey
 
 
 class GoogleSynthesizer(BaseSynthesizer):
@@ -11,12 +14,21 @@ class GoogleSynthesizer(BaseSynthesizer):
     Requires Google Cloud credentials to be set up via GOOGLE_APPLICATION_CREDENTIALS.
     """
 
+    provider = "google"
+    language_code = "el-GR"
+    voice_name = "el-GR-Standard-B"
+
     def __init__(self):
         """Initialize the Google Cloud synthesizer.
 
         Creates a new Text-to-Speech client using Google Cloud credentials.
         Handles initialization errors gracefully and sets client to None if failed.
+        The async client is created on first use and shared by every `asynthesize`
+        call running on the same event loop so its gRPC channel is reused.
         """
+        self._async_client: texttospeech.TextToSpeechAsyncClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
         if not texttospeech:
             self.client = None
             print("Google Cloud TTS library not found")
@@ -42,24 +54,55 @@ class GoogleSynthesizer(BaseSynthesizer):
         if not (text and filepath and self.client):
             return
 
-        input_text = texttospeech.SynthesisInput(text=text)
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="el-GR",
-            name="el-GR-Standard-B",
-            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE,
-        )
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
-        )
         try:
-            response: SynthesizeSpeechResponse = self.client.synthesize_speech(
-                request={
-                    "input": input_text,
-                    "voice": voice,
-                    "audio_config": audio_config,
-                }
+            response: SynthesizeSpeechResponse = self.scheduler.call(
+                self.client.synthesize_speech, request=self._build_request(text)
             )
-            with open(filepath, "wb") as f:
+            with atomic_write(filepath) as f:
                 f.write(response.audio_content)
         except Exception as e:
             print(f"Error synthesizing '{text}': {e}")
+
+    async def asynthesize(self, text: str, filepath: str) -> None:
+        """Synthesize text to speech using the async Google Cloud TTS client.
+
+        Args:
+            text: The text to synthesize into speech
+            filepath: Where the audio file will be saved
+        """
+        if not (text and filepath and self.client):
+            return
+
+        try:
+            client = self._get_async_client()
+            response: SynthesizeSpeechResponse = await self.scheduler.acall(
+                client.synthesize_speech, request=self._build_request(text)
+            )
+            with atomic_write(filepath) as f:
+                f.write(response.audio_content)
+        except Exception as e:
+            print(f"Error synthesizing '{text}': {e}")
+
+    def cache_key(self, text: str) -> CacheKey:
+        return CacheKey(self.provider, self.voice_name, self.language_code, text)
+
+    def _build_request(self, text: str) -> dict:
+        return {
+            "input": texttospeech.SynthesisInput(text=text),
+            "voice": texttospeech.VoiceSelectionParams(
+                language_code=self.language_code,
+                name=self.voice_name,
+                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE,
+            ),
+            "audio_config": texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3
+            ),
+        }
+
+    def _get_async_client(self) -> texttospeech.TextToSpeechAsyncClient:
+        # grpc.aio channels are bound to the loop that created them.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = texttospeech.TextToSpeechAsyncClient()
+            self._async_loop = loop
+        return self._async_client
@@ -0,0 +1,13 @@
+def column_letter(index: int) -> str:
+    """A1 notation letter of the 0-based column `index`: 0 -> A, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def quote_sheet(sheet: str) -> str:
+    """Quote a sheet name for use in an A1 range, e.g. 'Verbs Conjugated'!A1."""
+    return "'" + sheet.replace("'", "''") + "'"
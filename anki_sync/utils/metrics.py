@@ -0,0 +1,105 @@
+import contextlib
+import functools
+import json
+import pathlib
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+@dataclass
+class TimerStats:
+    """Accumulated wall clock time of a named stage."""
+
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class Metrics:
+    """Timers and counters collected during a sync run.
+
+    Safe to use from the audio worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers: dict[str, TimerStats] = {}
+        self.counters: Counter[str] = Counter()
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time the wrapped block under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timers.setdefault(name, TimerStats()).add(elapsed)
+
+    def timed(self, name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        """Decorator timing every call of the function under `name`."""
+
+        def decorator(func: Callable[P, R]) -> Callable[P, R]:
+            @functools.wraps(func)
+            def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                with self.timer(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "timers": {name: asdict(t) for name, t in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def dump_json(self, path: pathlib.Path) -> None:
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    def summary(self) -> str:
+        """Render the collected metrics as a plain text table."""
+        data = self.to_dict()
+        lines = [f"{'stage':<32} {'calls':>8} {'total (s)':>10} {'max (s)':>10}"]
+        for name, t in sorted(data["timers"].items(), key=lambda i: -i[1]["total"]):
+            lines.append(
+                f"{name:<32} {t['calls']:>8} {t['total']:>10.3f} {t['max']:>10.3f}"
+            )
+        if data["counters"]:
+            lines.append("")
+            lines.append(f"{'counter':<32} {'value':>8}")
+            for name, value in sorted(data["counters"].items()):
+                lines.append(f"{name:<32} {value:>8}")
+        return "\n".join(lines)
+
+
+# Global metrics instance
+metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Get the global metrics instance."""
+    return metrics
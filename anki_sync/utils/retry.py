@@ -0,0 +1,193 @@
+import asyncio
+import email.utils
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Mapping, TypeVar
+
+from anki_sync.utils.metrics import metrics
+
+R = TypeVar("R")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Requests per second and burst size per remote service.  These sit a little
+# under the default quotas so a long backfill settles at the quota instead of
+# bouncing off it.
+SCHEDULER_LIMITS: dict[str, tuple[float, int]] = {
+    "sheets": (1.0, 5),
+    "google": (10.0, 10),
+    "elevenlabs": (2.0, 2),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second.
+
+    Callers reserve a token and sleep until it is theirs, so waiting happens
+    outside the lock and requests are released in order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def block(self, seconds: float) -> None:
+        """Hold every caller back, used when the service asks us to slow down."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RetryScheduler:
+    """Rate limits calls to a remote service and retries the transient failures.
+
+    Every attempt first takes a token from the bucket. Retryable errors (429,
+    5xx, connection errors) are retried with exponential backoff and full
+    jitter, and a Retry-After sent by the service holds back every caller
+    sharing the scheduler.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 64.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, func: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        for attempt in itertools.count():
+            self.bucket.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                delay = self._retry_delay(exc, attempt)
+            time.sleep(delay)
+
+    async def acall(
+        self, func: Callable[..., Awaitable[R]], *args: Any, **kwargs: Any
+    ) -> R:
+        for attempt in itertools.count():
+            await self.bucket.aacquire()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as exc:
+                delay = self._retry_delay(exc, attempt)
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, exc: Exception, attempt: int) -> float:
+        """How long to wait before the next attempt, re-raises if there is none."""
+        if attempt + 1 >= self.max_attempts or not is_retryable(exc):
+            raise exc
+
+        backoff = min(self.max_delay, self.base_delay * 2**attempt)
+        delay = random.uniform(0, backoff)
+        server_delay = retry_after(exc)
+        if server_delay is not None:
+            delay = server_delay + random.uniform(0, self.base_delay)
+            self.bucket.block(delay)
+
+        metrics.count(f"retry.{self.name}")
+        return delay
+
+
+_schedulers: dict[str, RetryScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str) -> RetryScheduler:
+    """Get the process wide scheduler of a service, see SCHEDULER_LIMITS."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            rate, burst = SCHEDULER_LIMITS.get(name, (1.0, 1))
+            _schedulers[name] = RetryScheduler(name, rate, burst)
+        return _schedulers[name]
+
+
+def status_code(exc: BaseException) -> int | None:
+    """HTTP status of an error raised by one of the API clients, if any.
+
+    Covers googleapiclient's HttpError (`resp.status`), google.api_core
+    errors (`code`), ElevenLabs' ApiError (`status_code`) and httpx errors
+    (`response.status_code`).
+    """
+    for value in (
+        getattr(exc, "status_code", None),
+        getattr(getattr(exc, "resp", None), "status", None),
+        getattr(exc, "code", None),
+        getattr(getattr(exc, "response", None), "status_code", None),
+    ):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return status_code(exc) in RETRYABLE_STATUS
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds the service asked us to wait through a Retry-After header."""
+    headers: Mapping[str, Any] | None = None
+    for candidate in (
+        getattr(exc, "headers", None),
+        getattr(exc, "resp", None),
+        getattr(getattr(exc, "response", None), "headers", None),
+    ):
+        if isinstance(candidate, Mapping):
+            headers = candidate
+            break
+    if not headers:
+        return None
+
+    value = next(
+        (v for k, v in headers.items() if str(k).lower() == "retry-after"), None
+    )
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
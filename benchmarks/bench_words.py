@@ -0,0 +1,157 @@
+"""Benchmark building Word objects from raw sheet values.
+
+Times `Word.from_values` against a copy of the original path, a DataFrame of
+the sheet walked with `iterrows` into `Word.from_sheets`, on the same values.
+
+python -m benchmarks.bench_words --count 50000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, Iterable
+
+import attr
+import pandas
+
+from anki_sync.core.models.constants import Gender, Number, PartOfSpeech, Person, Tense
+from anki_sync.core.models.word import Word
+from anki_sync.utils.guid import generate_guid
+
+HEADER = [
+    "guid",
+    "English",
+    "Greek",
+    "Part of Speech",
+    "Gender",
+    "definitions",
+    "tag",
+    "sub tag 1",
+    "sub tag 2",
+]
+PARTS_OF_SPEECH = ["noun", "verb", "adjective", "adverb"]
+GENDERS = ["masculine", "feminine", "neuter", ""]
+TAGS = ["animals", "food", "family", "home", "travel"]
+
+
+def make_values(count: int, seed: int = 0, new_rows: int = 0) -> list[list[str]]:
+    """Synthetic sheet dump shaped like the `words` sheet.
+
+    Row `i` carries the guid `guid{i:08d}`, the last `new_rows` rows have no
+    guid yet like words freshly added to the sheet.
+    """
+    rng = random.Random(seed)
+    rows = [HEADER]
+    for i in range(count):
+        rows.append(
+            [
+                f"guid{i:08d}" if i < count - new_rows else "",
+                f"english {i}",
+                f"ελληνικά {i}",
+                rng.choice(PARTS_OF_SPEECH),
+                rng.choice(GENDERS),
+                f"definition of word {i}",
+                rng.choice(TAGS),
+                rng.choice(TAGS),
+                "",
+            ]
+        )
+    return rows
+
+
+@attr.s(auto_attribs=True, init=False)
+class BaselineWord:
+    """Word as it was before it was built from sheet values directly."""
+
+    english: str
+    greek: str
+    definitions: str = ""
+    synonyms: str = ""
+    antonyms: str = ""
+    etymology: str = ""
+    notes: str = ""
+    part_of_speech: PartOfSpeech = attr.ib(
+        default=PartOfSpeech.UNKNOWN, converter=PartOfSpeech
+    )
+    gender: Gender = attr.ib(default=Gender.UNKNOWN, converter=Gender)
+    person: Person = attr.ib(default=Person.UNKNOWN, converter=Person)
+    tense: Tense = attr.ib(default=Tense.UNKNOWN, converter=Tense)
+    number: Number = attr.ib(default=Number.UNKNOWN, converter=Number)
+    audio_filename: str = ""
+    guid: str = attr.ib(factory=lambda: generate_guid(10))
+    id: int | None = None
+    tags: list[str] = attr.ib(factory=list)
+
+    def __init__(self, **kwargs):
+        self._exists_in_anki = False
+        self._google_sheet_cell = ""
+        transformed_kwargs = {
+            key.lower().replace(" ", "_"): value for key, value in kwargs.items()
+        }
+        cls_fields = {f.name for f in attr.fields(self.__class__)}
+        self.__attrs_init__(
+            **{k: v for k, v in transformed_kwargs.items() if k in cls_fields}
+        )
+
+    @classmethod
+    def from_sheets(cls, row: tuple[int, pandas.Series]) -> "BaselineWord":
+        index, df = row
+        data = df.to_dict()
+        data["guid"] = df.guid
+        obj = cls(**data)
+        tag_columns = [col for col in df.index if "tag" in str(col).lower()]
+        obj.tags = [df[col] for col in tag_columns if df[col]]
+        obj.audio_filename = f"{obj.greek}.mp3"
+        obj._google_sheet_cell = f"A{index+2}"
+        return obj
+
+
+def baseline_words(values: list[list[str]]) -> Iterable[BaselineWord]:
+    data = pandas.DataFrame(values[1:], columns=values[0])
+    return (BaselineWord.from_sheets(row) for row in data.iterrows())
+
+
+def measure(build: Callable[[list[list[str]]], Iterable], count: int) -> dict:
+    values = make_values(count)
+
+    start = time.perf_counter()
+    words = list(build(values))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    words = list(build(values))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "words": len(words),
+        "seconds": elapsed,
+        "us_per_word": elapsed / count * 1e6,
+        "bytes_per_word": retained / count,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def bench_words(count: int) -> dict[str, float]:
+    return measure(Word.from_values, count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = {
+        "baseline": measure(baseline_words, args.count),
+        "current": bench_words(args.count),
+    }
+    print(f"{'':>15} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for key in results["current"]:
+        baseline, current = results["baseline"][key], results["current"][key]
+        ratio = f"{current / baseline:.2f}x" if baseline else ""
+        print(f"{key:>15} {baseline:>12,.2f} {current:>12,.2f} {ratio:>8}")
+
+
+if __name__ == "__main__":
+    main()
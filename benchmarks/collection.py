@@ -0,0 +1,80 @@
+"""Synthetic Anki collection for benchmarks."""
+
+import pathlib
+import random
+import sqlite3
+
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+from anki_sync.core.models.constants import ANKI_MODEL_ID
+
+NOTE_ID_BASE = 1_500_000_000_000
+CARD_ID_BASE = 1_600_000_000_000
+REVLOG_ID_BASE = 1_700_000_000_000
+
+
+def build_collection(
+    path: pathlib.Path,
+    notes: int,
+    cards_per_note: int = 2,
+    reviews_per_card: int = 10,
+    seed: int = 0,
+) -> pathlib.Path:
+    """Write a `collection.anki2` with the given number of notes, cards and reviews.
+
+    Note `i` gets the guid `guid{i:08d}` so it lines up with the rows produced
+    by `benchmarks.bench_words.make_values`.
+    """
+    rng = random.Random(seed)
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(APKG_SCHEMA)
+    conn.executescript(APKG_COL)
+
+    def note_rows():
+        for i in range(notes):
+            yield (
+                NOTE_ID_BASE + i,
+                f"guid{i:08d}",
+                ANKI_MODEL_ID,
+                0,
+                -1,
+                "",
+                f"english {i}\x1fελληνικά {i}",
+                f"english {i}",
+                0,
+                0,
+                "",
+            )
+
+    def card_rows():
+        for i in range(notes * cards_per_note):
+            note_id = NOTE_ID_BASE + i // cards_per_note
+            # fmt: off
+            yield (
+                CARD_ID_BASE + i, note_id, 1, i % cards_per_note, 0, -1, 2, 2,
+                rng.randint(0, 1000), rng.randint(1, 365), 2500,
+                reviews_per_card, 0, 0, 0, 0, 0, "",
+            )
+            # fmt: on
+
+    def revlog_rows():
+        for i in range(notes * cards_per_note * reviews_per_card):
+            card_id = CARD_ID_BASE + i // reviews_per_card
+            # fmt: off
+            yield (
+                REVLOG_ID_BASE + i, card_id, -1, rng.randint(1, 4),
+                rng.randint(1, 365), rng.randint(0, 365), 2500,
+                rng.randint(1000, 20000), 1,
+            )
+            # fmt: on
+
+    conn.executemany("INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?)", note_rows())
+    conn.executemany(
+        "INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", card_rows()
+    )
+    conn.executemany("INSERT INTO revlog VALUES(?,?,?,?,?,?,?,?,?)", revlog_rows())
+    conn.commit()
+    conn.close()
+    return path
@@ -0,0 +1,37 @@
+"""Local stand-ins for the network services used by a sync."""
+
+import time
+from typing import Any
+
+from anki_sync.core.synthesizers.base import BaseSynthesizer
+
+
+class FakeSheetsManager:
+    """Serves a fixed sheet dump and records write-backs instead of calling the API."""
+
+    def __init__(self, sheets: dict[str, list[list[str]]]):
+        self.sheets = sheets
+        self.updates: list[dict[str, Any]] = []
+
+    def get_values(self, sheet: str, note_class=None) -> list[list[str]]:
+        return [list(row) for row in self.sheets.get(sheet, [])]
+
+    def batch_get_values(
+        self, sheets: list[str], note_class=None
+    ) -> dict[str, list[list[str]]]:
+        return {sheet: self.get_values(sheet) for sheet in sheets}
+
+    def batch_update(self, updates: list[dict[str, Any]]) -> None:
+        self.updates.extend(updates)
+
+
+class FakeSynthesizer(BaseSynthesizer):
+    """Writes a few bytes per phrase after an optional simulated round-trip."""
+
+    latency: float = 0.0
+
+    def synthesize(self, text: str, output_directory: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        with open(output_directory, "wb") as f:
+            f.write(text.encode("utf-8"))
@@ -0,0 +1,199 @@
+"""Benchmark each stage of `anki-sync sync` against a synthetic collection.
+
+Runs fully offline: the Anki collection is generated on disk, the Google sheet
+and the TTS provider are replaced by the stand-ins in `benchmarks.fakes`.
+
+    python -m benchmarks.sync_bench --notes 20000 --new-rows 50
+    python -m benchmarks.sync_bench --compare benchmarks/results/<commit>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Iterator
+
+from anki_sync.config import update_config
+from anki_sync.core.models.genanki import Deck, DeckInfo, Package
+from anki_sync.core.models.word import Word
+from anki_sync.core.sources import SheetCache, load_values
+from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.synthesizers.audio_synthesizer import (
+    SYNTHESIZERS,
+    AudioSynthesizer,
+)
+from anki_sync.utils.metrics import get_metrics
+
+from .bench_words import make_values
+from .collection import build_collection
+from .fakes import FakeSheetsManager, FakeSynthesizer
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+
+class Stages:
+    """Wall clock time per named stage."""
+
+    def __init__(self, quiet: bool = True):
+        self.quiet = quiet
+        self.seconds: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name: str) -> Iterator[None]:
+        output = io.StringIO() if self.quiet else None
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            yield
+        self.seconds[name] = time.perf_counter() - start
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="anki-sync-bench-"))
+    media_dir = workdir / "collection.media"
+    media_dir.mkdir()
+    update_config(cache_dir=workdir / "cache", max_workers=args.workers)
+
+    SYNTHESIZERS["fake"] = FakeSynthesizer
+    FakeSynthesizer.latency = args.tts_latency
+
+    db_path = build_collection(
+        workdir / "collection.anki2",
+        notes=args.notes,
+        cards_per_note=args.cards_per_note,
+        reviews_per_card=args.reviews_per_card,
+    )
+    rows = args.notes + args.new_rows
+    sheets = FakeSheetsManager({"words": make_values(rows, new_rows=args.new_rows)})
+    # every word already in Anki has its audio, new words need synthesizing
+    for word in Word.from_values(sheets.get_values("words")[: args.notes + 1]):
+        (media_dir / word.audio_filename).write_bytes(b"")
+
+    stage = Stages(quiet=not args.verbose)
+    get_metrics().reset()
+
+    with stage("sheet_fetch"):
+        values = sheets.get_values("words")
+
+    # the same rows read back from the local copy `anki-sync pull` makes
+    SheetCache().save("words", values)
+    with stage("cache_load"):
+        load_values("words", "cache")
+
+    with stage("word_build"):
+        words = list(Word.from_values(values))
+
+    with AnkiDatabase(db_path) as anki_db:
+        with stage("guid_lookup"):
+            anki_db.load_guid_index()
+            for word in words:
+                anki_db.get_note_id_by_guid(word.guid)
+
+    with stage("audio_check"):
+        synth = AudioSynthesizer(media_dir, "fake")
+        for word in words:
+            synth.media_exists(word.audio_filename)
+        synth.join()
+
+    deck = Deck("Greek", media_dir)
+    with AnkiDatabase(db_path) as anki_db:
+        with stage("deck_generate"):
+            rows_to_update = deck.generate(
+                anki_db, sheets, DeckInfo("words", Word, "fake")
+            )
+
+        with stage("apkg_write"):
+            package = Package(deck)
+            package.media_files.extend(deck.media)
+            package.write_to_file(workdir / "greek.apkg")
+
+        deck.save_snapshot()
+
+        # the next sync with nothing new reuses the notes of the snapshot and
+        # only rewrites the collection
+        with stage("deck_regenerate"):
+            deck = Deck("Greek", media_dir)
+            deck.generate(anki_db, sheets, DeckInfo("words", Word, "fake"))
+
+        with stage("apkg_update"):
+            package = Package(deck)
+            package.media_files.extend(deck.media)
+            package.write_to_file(workdir / "greek.apkg")
+
+    with stage("batch_update"):
+        sheets.batch_update(rows_to_update)
+
+    return {
+        "commit": _git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "notes": args.notes,
+            "new_rows": args.new_rows,
+            "cards_per_note": args.cards_per_note,
+            "reviews_per_card": args.reviews_per_card,
+            "tts_latency": args.tts_latency,
+            "workers": args.workers,
+        },
+        "stages": stage.seconds,
+        "metrics": get_metrics().to_dict(),
+    }
+
+
+def compare(result: dict, baseline: dict) -> None:
+    print(f"{'stage':<15} {'baseline':>10} {'current':>10} {'ratio':>8}")
+    for name, seconds in result["stages"].items():
+        before = baseline["stages"].get(name)
+        if before:
+            print(
+                f"{name:<15} {before:>10.3f} {seconds:>10.3f} {seconds / before:>7.2f}x"
+            )
+        else:
+            print(f"{name:<15} {'-':>10} {seconds:>10.3f} {'-':>8}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--new-rows", type=int, default=50)
+    parser.add_argument("--cards-per-note", type=int, default=2)
+    parser.add_argument("--reviews-per-card", type=int, default=10)
+    parser.add_argument("--tts-latency", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--compare", type=pathlib.Path)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    result = run(args)
+    for name, seconds in result["stages"].items():
+        print(f"{name:>15}: {seconds:.3f}s")
+
+    output = args.output or RESULTS_DIR / f"{result['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"results written to {output}")
+
+    if args.compare:
+        compare(result, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
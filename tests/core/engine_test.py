@@ -0,0 +1,180 @@
+import json
+import pathlib
+import sqlite3
+import zipfile
+from unittest import mock
+
+import pytest
+from genanki.apkg_schema import APKG_SCHEMA
+
+from anki_sync.config import get_config
+from anki_sync.core.engine import SyncEngine
+from anki_sync.core.models.genanki import DeckInfo, Package
+from anki_sync.core.models.word import Word
+from anki_sync.core.sources import SheetCache
+from anki_sync.core.sql import AnkiDatabase
+from anki_sync.core.synthesizers.audio_synthesizer import SYNTHESIZERS
+from anki_sync.core.synthesizers.base import BaseSynthesizer
+
+HEADER = ["guid", "english", "greek", "part of speech", "tag"]
+
+
+class FakeSheets:
+    def __init__(self, sheets: dict[str, list[list[str]]]):
+        self.sheets = sheets
+        self.requests: list[list[str]] = []
+
+    def batch_get_values(
+        self, sheets: list[str], note_class=None
+    ) -> dict[str, list[list[str]]]:
+        self.requests.append(sheets)
+        return {sheet: self.sheets[sheet] for sheet in sheets}
+
+
+class SilentSynthesizer(BaseSynthesizer):
+    calls: list[str] = []
+
+    def synthesize(self, text: str, output_filename: str) -> None:
+        self.calls.append(text)
+        with open(output_filename, "wb") as f:
+            f.write(text.encode("utf-8"))
+
+
+@pytest.fixture
+def anki_db(tmp_path: pathlib.Path, monkeypatch) -> AnkiDatabase:
+    monkeypatch.setattr(get_config(), "cache_dir", tmp_path / "cache")
+    monkeypatch.setitem(SYNTHESIZERS, "silent", SilentSynthesizer)
+
+    db_path = tmp_path / "collection.anki2"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(APKG_SCHEMA)
+    conn.execute(
+        "INSERT INTO notes VALUES (1, 'guid_a', 1, 0, -1, '', '', '', 0, 0, '')"
+    )
+    conn.execute(
+        "INSERT INTO cards VALUES (10, 1, 1, 0, 0, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '')"
+    )
+    conn.commit()
+    conn.close()
+
+    with AnkiDatabase(db_path) as db:
+        yield db
+
+
+@pytest.fixture
+def sheets() -> FakeSheets:
+    return FakeSheets(
+        {
+            "words": [HEADER, ["guid_a", "dog", "σκύλος", "noun", "animals"]],
+            "verbs": [HEADER, ["", "to eat", "τρώω", "verb", "food"]],
+        }
+    )
+
+
+def test_single_sheet_is_the_root_deck(tmp_path, anki_db, sheets):
+    engine = SyncEngine(anki_db, sheets, tmp_path)
+    decks, rows_to_update = engine.run([DeckInfo("words", Word, "silent")])
+
+    assert [deck.name for deck in decks] == ["Greek"]
+    assert rows_to_update == []
+
+
+@pytest.mark.parametrize("history_copy", ["prefetch", "attach"])
+def test_sheets_are_synced_to_subdecks(
+    tmp_path, anki_db, sheets, monkeypatch, history_copy
+):
+    monkeypatch.setattr(get_config(), "history_copy", history_copy)
+    engine = SyncEngine(anki_db, sheets, tmp_path)
+    decks, rows_to_update = engine.run(
+        [
+            DeckInfo("words", Word, "silent"),
+            DeckInfo.from_spec("verbs=Ρήματα", note_class=Word, synthesizer="silent"),
+        ]
+    )
+
+    assert sheets.requests == [["words", "verbs"]]
+    assert [deck.name for deck in decks] == ["Greek::Words", "Greek::Ρήματα"]
+    assert [row["range"] for row in rows_to_update] == ["verbs!A2"]
+
+    package = Package(decks, manifest_path=tmp_path / "manifest.json")
+    for deck in decks:
+        package.media_files.extend(deck.media)
+    package.write_to_file(tmp_path / "greek.apkg")
+
+    with zipfile.ZipFile(tmp_path / "greek.apkg") as z:
+        z.extract("collection.anki2", tmp_path / "out")
+        assert sorted(json.loads(z.read("media")).values()) == [
+            "σκύλος.mp3",
+            "τρώω.mp3",
+        ]
+    conn = sqlite3.connect(tmp_path / "out" / "collection.anki2")
+    deck_names = json.loads(conn.execute("SELECT decks FROM col").fetchone()[0])
+    assert {"Greek::Words", "Greek::Ρήματα"} <= {d["name"] for d in deck_names.values()}
+    # the history of the existing note moved to its subdeck
+    assert conn.execute("SELECT id, did FROM cards").fetchall() == [
+        (10, decks[0].deck_id)
+    ]
+
+
+def test_sheets_can_only_be_synced_once(tmp_path, anki_db, sheets):
+    engine = SyncEngine(anki_db, sheets, tmp_path)
+    with pytest.raises(ValueError):
+        engine.run([DeckInfo("words", Word), DeckInfo("words", Word)])
+
+
+def test_local_sources_run_without_sheets(tmp_path, anki_db, sheets):
+    SheetCache().save("words", sheets.sheets["words"])
+
+    engine = SyncEngine(anki_db, None, tmp_path)
+    decks, rows_to_update = engine.run([DeckInfo("words", Word, "silent", "cache")])
+
+    assert [note.guid for note in decks[0].notes] == ["guid_a"]
+    assert rows_to_update == []
+
+
+def test_decks_share_one_synthesizer(tmp_path, anki_db, capsys):
+    SilentSynthesizer.calls = []
+    row = ["", "dog", "σκύλος", "noun", "animals"]
+    sheets = FakeSheets({"words": [HEADER, row], "nouns": [HEADER, row]})
+
+    engine = SyncEngine(anki_db, sheets, tmp_path)
+    engine.run([DeckInfo(sheet, Word, "silent") for sheet in ("words", "nouns")])
+
+    assert SilentSynthesizer.calls == ["σκύλος"]
+    # each deck's output is printed in one piece, in deck order, and what the
+    # audio workers report comes after it
+    lines = [
+        line.split()[0]
+        for line in capsys.readouterr().out.splitlines()
+        if line.lstrip().startswith("+")
+        or " rows: " in line
+        or line.startswith("generated new audio")
+    ]
+    assert lines == ["+", "words", "+", "nouns", "generated"]
+
+
+def test_unchanged_rows_are_rebuilt_from_the_snapshot(
+    tmp_path, anki_db, sheets, monkeypatch
+):
+    words = DeckInfo("words", Word, "silent")
+    engine = SyncEngine(anki_db, sheets, tmp_path)
+    (deck,), _ = engine.run([words])
+    first = [(note.guid, note.fields, note.tags) for note in deck.notes]
+    # nothing is stored until the package is written
+    assert not (get_config().cache_dir / "snapshots").exists()
+    deck.save_snapshot()
+
+    with monkeypatch.context() as m:
+        m.setattr(Word, "from_row", mock.Mock(side_effect=AssertionError("parsed")))
+        (deck,), rows_to_update = engine.run([words])
+
+    assert deck.snapshot.stats == {"unchanged": 1}
+    assert [(note.guid, note.fields, note.tags) for note in deck.notes] == first
+    assert [note.id for note in deck.notes] == [1]
+    assert rows_to_update == []
+
+    # a changed row goes through Word again
+    sheets.sheets["words"][1][1] = "hound"
+    (deck,), _ = engine.run([words])
+    assert deck.snapshot.stats == {"changed": 1}
+    assert deck.notes[0].fields[0] == "hound"
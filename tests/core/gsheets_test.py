@@ -0,0 +1,241 @@
+import json
+from unittest import mock
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from anki_sync.config import get_config
+from anki_sync.core import gsheets
+from anki_sync.core.auth.auth import GoogleAuth
+from anki_sync.core.gsheets import GoogleSheetsManager, chunk_updates, coalesce_updates
+from anki_sync.core.models.word import Word
+from anki_sync.utils.retry import RetryScheduler
+
+VALUES = [["guid", "english", "greek"], ["abc", "dog", "σκύλος"], ["", "cat"]]
+PADDED = [VALUES[0], VALUES[1], ["", "cat", ""]]
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_config(), "cache_dir", tmp_path)
+    monkeypatch.setattr(get_config(), "conditional_fetch", True)
+    monkeypatch.setattr(GoogleAuth, "__init__", lambda self: None)
+    monkeypatch.setattr(GoogleAuth, "certs", None)
+    scheduler = RetryScheduler("test", rate=1000.0, burst=1000)
+    monkeypatch.setattr(gsheets, "get_scheduler", lambda name: scheduler)
+
+    services = {"sheets": mock.MagicMock(), "drive": mock.MagicMock()}
+    monkeypatch.setattr(gsheets, "build", lambda name, *a, **kw: services[name])
+
+    values = services["sheets"].spreadsheets().values()
+    values.get().execute.return_value = {"values": VALUES}
+    values.batchGet().execute.return_value = {"valueRanges": [{"values": VALUES}]}
+    services["drive"].files().get().execute.return_value = {
+        "version": "7",
+        "modifiedTime": "2026-01-01T00:00:00.000Z",
+    }
+    return services
+
+
+def fetches(services, method="get") -> int:
+    return getattr(
+        services["sheets"].spreadsheets().values(), method
+    )().execute.call_count
+
+
+def set_version(services, version: str):
+    services["drive"].files().get().execute.return_value = {
+        "version": version,
+        "modifiedTime": "2026-01-02T00:00:00.000Z",
+    }
+
+
+def test_unchanged_spreadsheet_is_served_from_cache(services):
+    assert GoogleSheetsManager("id").get_values("words") == VALUES
+    # the next run finds the same revision
+    manager = GoogleSheetsManager("id")
+    assert manager.get_values("words") == PADDED
+    assert manager.batch_get_values(["words"]) == {"words": PADDED}
+    assert fetches(services) == 1
+    assert fetches(services, "batchGet") == 0
+
+    set_version(services, "8")
+    assert GoogleSheetsManager("id").batch_get_values(["words"]) == {"words": VALUES}
+    assert fetches(services, "batchGet") == 1
+
+
+def test_write_back_invalidates_revision(services):
+    manager = GoogleSheetsManager("id")
+    manager.get_values("words")
+    manager.batch_update([{"range": "words!A3", "values": [["def"]]}])
+    set_version(services, "8")
+
+    manager.get_values("words")
+    assert fetches(services) == 2
+
+
+def test_without_revision_every_read_fetches(services, monkeypatch):
+    drive = services["drive"].files().get()
+    drive.execute.side_effect = HttpError(httplib2.Response({"status": 403}), b"")
+    manager = GoogleSheetsManager("id")
+    manager.get_values("words")
+    manager.get_values("words")
+    assert fetches(services) == 2
+    assert drive.execute.call_count == 1
+
+    monkeypatch.setattr(get_config(), "conditional_fetch", False)
+    GoogleSheetsManager("id").get_values("words")
+    assert fetches(services) == 3
+    assert drive.execute.call_count == 1
+
+
+def test_only_word_columns_are_read(services):
+    values = services["sheets"].spreadsheets().values()
+    header = ["guid", "english", "my notes", "greek", "part of speech", "extra", "tag"]
+    values.batchGet().execute.side_effect = [
+        {"valueRanges": [{"values": [header]}]},
+        {
+            "valueRanges": [
+                {"values": [["abc", "", "def"], ["dog", "cat", "1/15/2026"]]},
+                {"values": [["σκύλος", "γάτα"], ["noun"]]},
+                {"values": [["animals", "", "50%"]]},
+            ]
+        },
+    ]
+    values.batchGet.reset_mock()
+
+    result = GoogleSheetsManager("id").get_values("words", Word)
+
+    assert result == [
+        header,
+        ["abc", "dog", "", "σκύλος", "noun", "", "animals"],
+        ["", "cat", "", "γάτα", "", "", ""],
+        ["def", "1/15/2026", "", "", "", "", "50%"],
+    ]
+    headers, columns = values.batchGet.call_args_list
+    assert headers.kwargs["ranges"] == ["'words'!1:1"]
+    assert columns.kwargs["ranges"] == ["'words'!A2:B", "'words'!D2:E", "'words'!G2:G"]
+    assert columns.kwargs["majorDimension"] == "COLUMNS"
+    # dates and percentages read as displayed, the same as in csv exports
+    assert columns.kwargs["valueRenderOption"] == "FORMATTED_VALUE"
+
+    # the projected copy is cached apart from full reads of the sheet
+    assert GoogleSheetsManager("id").get_values("words", Word) == result
+    assert GoogleSheetsManager("id").get_values("words") == VALUES
+
+
+def guid_updates(rows) -> list[dict]:
+    return [{"range": f"words!A{row}", "values": [[f"g{row}"]]} for row in rows]
+
+
+def test_coalesce_updates():
+    updates = guid_updates([5, 3, 4, 9, 10, 11, 12])
+    updates.append({"range": "words!A9", "values": [["new"]]})
+    updates.append({"range": "words!B2:C2", "values": [["x", "y"]]})
+
+    assert coalesce_updates(updates, max_cells=3) == [
+        {"range": "words!A3:A5", "values": [["g3"], ["g4"], ["g5"]]},
+        {"range": "words!A9:A11", "values": [["new"], ["g10"], ["g11"]]},
+        {"range": "words!A12", "values": [["g12"]]},
+        {"range": "words!B2:C2", "values": [["x", "y"]]},
+    ]
+
+
+def test_chunk_updates():
+    updates = coalesce_updates(guid_updates([*range(2, 6), *range(8, 10)]), 3)
+    chunks = chunk_updates(updates, max_cells=4)
+
+    assert [[u["range"] for u in chunk] for chunk in chunks] == [
+        ["words!A2:A4", "words!A5"],
+        ["words!A8:A9"],
+    ]
+
+
+def interrupted_write_back(services, monkeypatch, tmp_path, match="1 of 3"):
+    """Write back rows 2-7 in chunks of two, with the middle chunk failing."""
+    monkeypatch.setattr(gsheets, "WRITE_CHUNK_CELLS", 2)
+    values = services["sheets"].spreadsheets().values()
+    values.batchUpdate().execute.side_effect = [{}, ValueError("boom"), {}]
+
+    with pytest.raises(RuntimeError, match=match):
+        GoogleSheetsManager("id").batch_update(guid_updates(range(2, 8)))
+    checkpoint = tmp_path / "write_back" / "id.json"
+    assert checkpoint.exists()
+
+    values.batchUpdate().execute.side_effect = None
+    values.batchUpdate.reset_mock()
+    return values, checkpoint
+
+
+def sent(values) -> list:
+    return [c.kwargs["body"]["data"] for c in values.batchUpdate.call_args_list]
+
+
+def test_interrupted_write_back_is_resent_to_empty_cells(
+    services, monkeypatch, tmp_path
+):
+    values, checkpoint = interrupted_write_back(services, monkeypatch, tmp_path)
+    assert json.loads(checkpoint.read_text())["revision"].startswith("7@")
+    # row 5 got a GUID by hand in the meantime, without a new revision yet
+    values.batchGet().execute.return_value = {
+        "valueRanges": [{"range": "words!A4:A5", "values": [[], ["manual"]]}]
+    }
+
+    assert GoogleSheetsManager("id").resume_write_back() == 1
+    assert sent(values) == [[{"range": "words!A4", "values": [["g4"]]}]]
+    assert not checkpoint.exists()
+
+
+def test_interrupted_write_back_is_dropped_when_rows_shift(
+    services, monkeypatch, tmp_path
+):
+    values, checkpoint = interrupted_write_back(services, monkeypatch, tmp_path)
+    # a row inserted above row 4 moves the rows the pending GUIDs belong to
+    set_version(services, "8")
+
+    assert GoogleSheetsManager("id").resume_write_back() == 0
+    assert sent(values) == []
+    assert not checkpoint.exists()
+
+
+def test_interrupted_write_back_without_revisions_checks_the_rows(
+    services, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(get_config(), "conditional_fetch", False)
+    values = services["sheets"].spreadsheets().values()
+    # the rows of the failed chunk when the write-back stopped
+    values.batchGet().execute.return_value = {
+        "valueRanges": [{"values": [["", "dog", "σκύλος"], ["", "cat"]]}]
+    }
+    values, checkpoint = interrupted_write_back(
+        services, monkeypatch, tmp_path, match="unless their rows change"
+    )
+    assert json.loads(checkpoint.read_text())["revision"] is None
+
+    # a row inserted above row 5 moved "cat" down, row 4 is untouched
+    values.batchGet().execute.return_value = {
+        "valueRanges": [{"values": [["", "dog", "σκύλος", ""], ["", "new"]]}]
+    }
+    values.batchGet.reset_mock()
+
+    assert GoogleSheetsManager("id").resume_write_back() == 1
+    assert values.batchGet.call_args.kwargs["ranges"] == ["words!4:5"]
+    assert sent(values) == [[{"range": "words!A4", "values": [["g4"]]}]]
+    assert not checkpoint.exists()
+
+
+def test_interrupted_write_back_without_revisions_or_rows_is_dropped(
+    services, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(get_config(), "conditional_fetch", False)
+    values = services["sheets"].spreadsheets().values()
+    values.batchGet().execute.side_effect = ValueError("offline")
+    values, checkpoint = interrupted_write_back(
+        services, monkeypatch, tmp_path, match="dropped, their rows can't be checked"
+    )
+    values.batchGet().execute.side_effect = None
+
+    assert GoogleSheetsManager("id").resume_write_back() == 0
+    assert sent(values) == []
+    assert not checkpoint.exists()
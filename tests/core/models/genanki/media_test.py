@@ -0,0 +1,48 @@
+import hashlib
+import pathlib
+import zipfile
+from unittest.mock import patch
+
+import genanki
+
+from anki_sync.core.models.genanki import MediaFile, MediaManifest, Package
+
+
+def test_media_manifest(tmp_path: pathlib.Path):
+    (tmp_path / "ένα.mp3").write_bytes(b"one")
+    (tmp_path / "δύο.mp3").write_bytes(b"two")
+
+    manifest = MediaManifest(tmp_path)
+    for filename in ("ένα.mp3", "missing.mp3", "δύο.mp3", "ένα.mp3", "missing.mp3"):
+        manifest.add(filename)
+
+    assert manifest.resolve() == ["missing.mp3"]
+    # reported once
+    assert manifest.resolve() == []
+    assert manifest.missing == ["missing.mp3"]
+
+    files = list(manifest)
+    assert [f.filename for f in files] == ["ένα.mp3", "δύο.mp3"]
+    assert files[0].size == 3
+    assert files[0].sha1 == hashlib.sha1(b"one").hexdigest()
+
+
+def test_package_reuses_manifest_stats(tmp_path: pathlib.Path):
+    media_dir = tmp_path / "collection.media"
+    media_dir.mkdir()
+    (media_dir / "ένα.mp3").write_bytes(b"one")
+    manifest = MediaManifest(media_dir)
+    manifest.add("ένα.mp3")
+    media = list(manifest)
+
+    package = Package(
+        genanki.Deck(1, "Greek"),
+        media_files=media,
+        manifest_path=tmp_path / "manifest.json",
+    )
+    with patch.object(MediaFile, "from_path") as from_path:
+        package.write_to_file(tmp_path / "greek.apkg")
+    from_path.assert_not_called()
+
+    with zipfile.ZipFile(tmp_path / "greek.apkg") as z:
+        assert z.read("0") == b"one"
@@ -0,0 +1,162 @@
+import json
+import os
+import pathlib
+import zipfile
+from unittest import mock
+
+import genanki
+import pytest
+
+from anki_sync.core.models.genanki import Package
+from anki_sync.core.models.genanki import package as package_module
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "collection.media"
+    path.mkdir()
+    for name in ("ένα", "δύο"):
+        (path / f"{name}.mp3").write_bytes(name.encode("utf-8") * 100)
+    return path
+
+
+def write(tmp_path, media_files):
+    package = Package(
+        genanki.Deck(1, "Greek"),
+        media_files=[str(p) for p in media_files],
+        manifest_path=tmp_path / "manifest.json",
+    )
+    package.write_to_file(tmp_path / "greek.apkg", timestamp=0)
+    return package
+
+
+def read(tmp_path) -> dict[str, bytes]:
+    """Media of the package by filename, after checking its layout."""
+    with zipfile.ZipFile(tmp_path / "greek.apkg") as z:
+        assert z.testzip() is None
+        names = z.namelist()
+        assert names[-2:] == ["collection.anki2", "media"]
+        assert len(names) == len(set(names))
+        mapping = json.loads(z.read("media"))
+        assert sorted(mapping) == sorted(names[:-2])
+        for name in mapping:
+            assert z.getinfo(name).compress_type == zipfile.ZIP_STORED
+        return {filename: z.read(name) for name, filename in mapping.items()}
+
+
+def test_appends_new_media(tmp_path, media_dir):
+    first = write(tmp_path, sorted(media_dir.iterdir()))
+    assert first.stats["rewritten"] == 1
+
+    (media_dir / "τρία.mp3").write_bytes(b"three")
+    second = write(tmp_path, sorted(media_dir.iterdir()))
+    assert second.stats["appended"] == 1
+    assert second.stats["media_reused"] == 2
+    assert second.stats["media_written"] == 1
+
+    media = read(tmp_path)
+    assert media["τρία.mp3"] == b"three"
+    assert media["ένα.mp3"] == "ένα".encode("utf-8") * 100
+
+
+def test_rewrites_when_media_changes(tmp_path, media_dir):
+    write(tmp_path, sorted(media_dir.iterdir()))
+
+    (media_dir / "ένα.mp3").write_bytes(b"new voice")
+    package = write(tmp_path, sorted(media_dir.iterdir()))
+    assert package.stats["rewritten"] == 1
+    assert read(tmp_path)["ένα.mp3"] == b"new voice"
+
+
+def test_rewrites_when_media_is_removed(tmp_path, media_dir):
+    write(tmp_path, sorted(media_dir.iterdir()))
+
+    package = write(tmp_path, [media_dir / "ένα.mp3"])
+    assert package.stats["rewritten"] == 1
+    assert list(read(tmp_path)) == ["ένα.mp3"]
+
+
+def test_rewrites_when_package_was_replaced(tmp_path, media_dir):
+    write(tmp_path, sorted(media_dir.iterdir()))
+    (tmp_path / "greek.apkg").write_bytes(b"not a zip")
+
+    package = write(tmp_path, sorted(media_dir.iterdir()))
+    assert package.stats["rewritten"] == 1
+    assert len(read(tmp_path)) == 2
+
+
+def test_failed_append_keeps_previous_package(tmp_path, media_dir, monkeypatch):
+    write(tmp_path, sorted(media_dir.iterdir()))
+    before = (tmp_path / "greek.apkg").read_bytes()
+
+    def broken(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(package_module, "_write_media", broken)
+    (media_dir / "τρία.mp3").write_bytes(b"three")
+    with pytest.raises(OSError):
+        write(tmp_path, sorted(media_dir.iterdir()))
+
+    assert (tmp_path / "greek.apkg").read_bytes() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "collection.media",
+        "greek.apkg",
+        "manifest.json",
+    ]
+
+
+def test_failed_collection_write_is_cleaned_up(tmp_path, media_dir, monkeypatch):
+    monkeypatch.setattr(package_module.tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    monkeypatch.setattr(genanki.Deck, "write_to_db", mock.Mock(side_effect=ValueError))
+
+    with pytest.raises(ValueError):
+        write(tmp_path, sorted(media_dir.iterdir()))
+
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_append_copies_compressed_entries_raw(tmp_path, media_dir):
+    (media_dir / "notes.txt").write_bytes(b"compressible " * 1000)
+    write(tmp_path, sorted(media_dir.iterdir()))
+    with zipfile.ZipFile(tmp_path / "greek.apkg") as z:
+        before = {i.filename: (i.compress_size, i.CRC) for i in z.infolist()}
+
+    (media_dir / "τρία.mp3").write_bytes(b"three")
+    with mock.patch.object(
+        zipfile.ZipFile, "open", autospec=True, side_effect=zipfile.ZipFile.open
+    ) as zip_open:
+        package = write(tmp_path, sorted(media_dir.iterdir()))
+    assert package.stats["appended"] == 1
+    # the previous entries are not read, only new ones written
+    modes = [
+        c.kwargs.get("mode", c.args[2] if len(c.args) > 2 else "r")
+        for c in zip_open.call_args_list
+    ]
+    assert modes and set(modes) == {"w"}
+
+    with zipfile.ZipFile(tmp_path / "greek.apkg") as z:
+        assert z.testzip() is None
+        for info in z.infolist()[:3]:
+            assert (info.compress_size, info.CRC) == before[info.filename]
+        text = next(i for i in z.infolist() if i.compress_type == zipfile.ZIP_DEFLATED)
+        assert z.read(text) == b"compressible " * 1000
+
+
+def test_rewrites_when_an_entry_is_damaged(tmp_path, media_dir):
+    write(tmp_path, sorted(media_dir.iterdir()))
+    path = tmp_path / "greek.apkg"
+    stat = path.stat()
+    with zipfile.ZipFile(path) as z:
+        offset = z.getinfo("0").header_offset
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"XXXX")
+    # looks untouched to the manifest
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    (media_dir / "τρία.mp3").write_bytes(b"three")
+    package = write(tmp_path, sorted(media_dir.iterdir()))
+    assert package.stats["rewritten"] == 1
+    assert package.stats["appended"] == 0
+    assert len(read(tmp_path)) == 3
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from anki_sync.core.models.genanki.writer import INSERT_STATEMENTS, BulkWriter
+from anki_sync.core.sql import Table
+
+
+@pytest.fixture
+def cursor(tmp_path):
+    conn = sqlite3.connect(tmp_path / "collection.anki2")
+    for table, statement in INSERT_STATEMENTS.items():
+        columns = ", ".join(f"c{i}" for i in range(statement.count("?")))
+        conn.execute(f"CREATE TABLE {table.value} ({columns})")
+    conn.execute("CREATE TABLE col (id)")
+    conn.execute("INSERT INTO col VALUES (1)")
+    conn.commit()
+    yield conn.cursor()
+    conn.close()
+
+
+def note(i: int) -> tuple:
+    return (i, *[""] * (INSERT_STATEMENTS[Table.NOTES].count("?") - 1))
+
+
+def count(cursor, table: Table) -> int:
+    return cursor.execute(f"SELECT count(*) FROM {table.value}").fetchone()[0]
+
+
+def test_rows_are_flushed_per_chunk(cursor):
+    with BulkWriter(cursor, chunk_size=2) as writer:
+        writer.insert(Table.NOTES, note(1))
+        assert count(cursor, Table.NOTES) == 0
+        writer.insert(Table.NOTES, note(2))
+        assert count(cursor, Table.NOTES) == 2
+        writer.insert(Table.NOTES, note(3))
+        assert count(cursor, Table.NOTES) == 2
+    assert count(cursor, Table.NOTES) == 3
+
+
+def test_rows_are_committed_on_exit(cursor, tmp_path):
+    with BulkWriter(cursor, chunk_size=100) as writer:
+        assert cursor.connection.in_transaction
+        writer.insert(Table.NOTES, note(1))
+    assert not cursor.connection.in_transaction
+
+    # visible to another connection, so the commit happened
+    with sqlite3.connect(tmp_path / "collection.anki2") as other:
+        assert other.execute("SELECT c0 FROM notes").fetchall() == [(1,)]
+
+
+def test_error_rolls_back_every_row(cursor):
+    with pytest.raises(ValueError):
+        with BulkWriter(cursor, chunk_size=2) as writer:
+            for i in range(5):
+                writer.insert(Table.NOTES, note(i))
+            writer.execute("UPDATE col SET id = 2")
+            raise ValueError("boom")
+
+    # including the chunks already flushed and statements passed through
+    assert count(cursor, Table.NOTES) == 0
+    assert cursor.execute("SELECT id FROM col").fetchone() == (1,)
+    assert not cursor.connection.in_transaction
+
+
+def test_execute_passes_through_to_the_cursor(cursor):
+    with BulkWriter(cursor, chunk_size=100) as writer:
+        # the chain genanki uses, e.g. to read the models of the collection
+        assert writer.execute("SELECT id FROM col").fetchone() == (1,)
+        writer.execute("UPDATE col SET id = ?", (3,))
+    assert cursor.execute("SELECT id FROM col").fetchone() == (3,)
@@ -4,7 +4,7 @@ from unittest.mock import MagicMock, patch
 import pandas as pd
 import pytest
 
-from anki_sync.core.models.word import AudioMeta, Noun, PartOfSpeech, Word
+from anki_sync.core.models.word import AudioMeta, Gender, PartOfSpeech, Word
 
 
 @pytest.fixture
@@ -33,7 +33,7 @@ class TestBaseWord:
 
     def test_process_tags(self, noun_data: dict):
         series = pd.Series(noun_data)
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         word.process_tags(series)
         assert word.tags == ["test tag", "test sub tag 1"]
 
@@ -41,9 +41,9 @@ class TestBaseWord:
     def test_from_sheets(self, mock_generate_guid: MagicMock, noun_series: pd.Series):
         mock_generate_guid.return_value = "test_guid"
         row = (0, noun_series)
-        word = Noun.from_sheets(row)
+        word = Word.from_sheets(row)
 
-        assert isinstance(word, Noun)
+        assert isinstance(word, Word)
         assert word.english == "test english"
         assert word.greek == "test greek"
         assert word.part_of_speech == PartOfSpeech.NOUN
@@ -52,6 +52,26 @@ class TestBaseWord:
         assert word.audio_filename == "test greek.mp3"
         assert word._google_sheet_cell == "A2"
 
+    def test_from_values(self):
+        values = [
+            ["guid", "English", "Greek", "Part of Speech", "tag", "sub tag 1"],
+            ["guid_a", "dog", "σκύλος", "noun", "animals", "pets"],
+            ["guid_b", "cat", "γάτα", "noun"],
+        ]
+        words = list(Word.from_values(values))
+
+        assert [w.guid for w in words] == ["guid_a", "guid_b"]
+        assert words[0].part_of_speech is PartOfSpeech.NOUN
+        assert words[0].tags == ["animals", "pets"]
+        assert words[1].tags == []
+        assert words[1].audio_filename == "γάτα.mp3"
+        assert words[1]._google_sheet_cell == "A3"
+
+    def test_invalid_enum_value(self, noun_data: dict):
+        noun_data["gender"] = "not a gender"
+        with pytest.raises(ValueError):
+            Word(**noun_data)
+
     def test_from_ankidb(self):
         note_data = {
             "data": json.dumps(
@@ -62,28 +82,27 @@ class TestBaseWord:
                     "gender": "masculine",
                 }
             ),
-            "name": "test_guid",
             "id": 123,
         }
-        note = pd.Series(note_data)
-        word = Noun.from_ankidb(note)
+        note = pd.Series(note_data, name="test_guid", dtype=object)
+        word = Word.from_ankidb(note)
 
-        assert isinstance(word, Noun)
+        assert isinstance(word, Word)
         assert word.english == "test english"
         assert word.greek == "test greek"
         assert word.guid == "test_guid"
         assert word.id == 123
 
     def test_from_ankidb_with_no_data(self):
-        note_data = {"data": None, "name": "test_guid", "id": 123}
-        note = pd.Series(note_data)
-        word = Noun.from_ankidb(note)
+        note_data = {"data": None, "id": 123}
+        note = pd.Series(note_data, name="test_guid", dtype=object)
+        word = Word.from_ankidb(note)
         assert word is None
 
     def test_to_note(self, noun_data: dict):
         mock_anki_db = MagicMock()
         mock_anki_db.get_note_id_by_guid.return_value = (123, True)
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         note = word.to_note(mock_anki_db)
 
         assert note.id == 123
@@ -100,26 +119,26 @@ class TestBaseWord:
         mock_generate_guid.return_value = "new_guid"
         mock_anki_db = MagicMock()
         mock_anki_db.get_note_id_by_guid.return_value = (None, False)
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         note = word.to_note(mock_anki_db)
 
         assert note.id is None
         assert note.guid == "new_guid"
 
     def test_get_note_tags(self, noun_data: dict):
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         word.tags = ["tag1", "tag2"]
         tags = word.get_note_tags()
         assert tags == ["grammar::noun", "tag1", "tag1::tag2"]
 
     def test_get_note_tags_with_no_tags(self, noun_data: dict):
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         word.tags = []
         tags = word.get_note_tags()
         assert tags == ["grammar::noun"]
 
     def test_get_audio_meta(self, noun_data: dict):
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         word.audio_filename = "test.mp3"
         audio_meta = word.get_audio_meta()
         assert isinstance(audio_meta, AudioMeta)
@@ -127,6 +146,6 @@ class TestBaseWord:
         assert audio_meta.filename == "test.mp3"
 
     def test_process_audio_filename(self, noun_data: dict):
-        word = Noun(**noun_data)
+        word = Word(**noun_data)
         filename = word.process_audio_filename()
         assert filename == "test greek.mp3"
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from anki_sync.config import get_config
+from anki_sync.core import snapshot as snapshot_module
+from anki_sync.core.models.word import Word
+from anki_sync.core.snapshot import SheetSnapshot, SnapshotEntry, snapshot_path
+
+HEADER = ["guid", "english", "greek"]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "snapshots" / "words.jsonl"
+
+
+def entry(row_hash: str, english: str = "dog") -> SnapshotEntry:
+    return SnapshotEntry(
+        row_hash, [english, "σκύλος\u2028"], ["animals"], "σκύλος", "σκύλος.mp3"
+    )
+
+
+def test_hash_row_ignores_the_guid():
+    row = ["abc", "dog", "σκύλος"]
+    assert SheetSnapshot.hash_row(HEADER, row) == SheetSnapshot.hash_row(
+        HEADER, ["", "dog", "σκύλος"]
+    )
+    assert SheetSnapshot.hash_row(HEADER, row) != SheetSnapshot.hash_row(
+        HEADER, ["abc", "cat", "σκύλος"]
+    )
+    # the same cells under another header are a different row
+    assert SheetSnapshot.hash_row(HEADER, row) != SheetSnapshot.hash_row(
+        ["guid", "greek", "english"], row
+    )
+    hash_row = SheetSnapshot.row_hasher(HEADER)
+    assert hash_row(row) == SheetSnapshot.hash_row(HEADER, row)
+
+
+def test_lookup(path):
+    hash_row = SheetSnapshot.row_hasher(HEADER)
+    first = SheetSnapshot(path)
+    assert first.lookup("a", hash_row(["a", "dog", "σκύλος"])) is None
+    first.record("a", entry(hash_row(["a", "dog", "σκύλος"])))
+    first.record("b", entry(hash_row(["b", "cat", "γάτα"]), "cat"))
+    first.save()
+
+    second = SheetSnapshot(path)
+    unchanged = second.lookup("a", hash_row(["a", "dog", "σκύλος"]))
+    assert unchanged == entry(hash_row(["a", "dog", "σκύλος"]))
+    assert second.lookup("b", hash_row(["b", "cats", "γάτες"])) is None
+    assert second.lookup("", hash_row(["", "bird", "πουλί"])) is None
+    assert second.lookup("c", hash_row(["c", "fish", "ψάρι"])) is None
+    assert second.stats == {"unchanged": 1, "changed": 1, "added": 2}
+
+    second.keep("a")
+    assert second.deleted == 1
+
+
+def test_kept_rows_are_written_back_as_read(path):
+    first = SheetSnapshot(path)
+    first.record("a", entry("h1"))
+    first.save()
+    line = path.read_text(encoding="utf-8").split("\n")[1]
+
+    second = SheetSnapshot(path)
+    second.keep("a")
+    second.record("b", entry("h2", "cat"))
+    second.save()
+
+    assert path.read_text(encoding="utf-8").split("\n")[1] == line
+    assert set(SheetSnapshot(path).previous) == {"a", "b"}
+
+
+def test_save_replaces_the_snapshot_atomically(path, monkeypatch):
+    first = SheetSnapshot(path)
+    first.record("a", entry("h1"))
+    first.save()
+    before = path.read_bytes()
+
+    def broken(*args):
+        raise OSError("disk full")
+
+    second = SheetSnapshot(path)
+    second.record("b", entry("h2"))
+    monkeypatch.setattr(snapshot_module.os, "replace", broken)
+    with pytest.raises(OSError):
+        second.save()
+    assert path.read_bytes() == before
+
+
+def test_other_versions_are_ignored(path, monkeypatch):
+    first = SheetSnapshot(path)
+    first.record("a", entry("h1"))
+    first.save()
+
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_VERSION", 3)
+    assert SheetSnapshot(path).previous == {}
+
+    # the single JSON document of the first snapshot format
+    path.write_text(json.dumps({"version": 1, "rows": {}}))
+    assert SheetSnapshot(path).previous == {}
+    path.write_text("not json")
+    assert SheetSnapshot(path).previous == {}
+
+
+def test_snapshot_path_is_keyed_by_spreadsheet_sheet_and_note_class(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(get_config(), "cache_dir", tmp_path)
+
+    class Noun(Word):
+        pass
+
+    paths = {
+        snapshot_path("one", "words", Word),
+        snapshot_path("two", "words", Word),
+        snapshot_path("one", "nouns", Word),
+        snapshot_path("one", "words", Noun),
+    }
+    assert len(paths) == 4
+    assert {p.parent for p in paths} == {tmp_path / "snapshots"}
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from anki_sync.config import get_config
+from anki_sync.core.sources import SheetCache, load_values
+
+VALUES = [
+    ["guid", "english", "greek", "part of speech"],
+    ["abc", "dog", "σκύλος", "noun"],
+    ["", "to eat", "τρώω"],
+]
+PADDED = [VALUES[0], VALUES[1], ["", "to eat", "τρώω", ""]]
+
+
+@pytest.fixture(autouse=True)
+def local_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_config(), "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(get_config(), "source_dir", tmp_path)
+
+
+def test_cache(tmp_path):
+    cache = SheetCache()
+    path = cache.save("words", VALUES)
+
+    assert path == tmp_path / "cache" / "sheets" / "words.json"
+    assert load_values("words", "cache") == PADDED
+    assert cache.save("empty", []) and load_values("empty", "cache") == []
+
+
+def test_cache_not_pulled():
+    with pytest.raises(FileNotFoundError, match="anki-sync pull"):
+        load_values("words", "cache")
+
+
+def test_csv(tmp_path):
+    # written the way scripts/process.py dumps sheets, index column included
+    pd.DataFrame(PADDED[1:], columns=PADDED[0]).to_csv(tmp_path / "words.csv")
+
+    assert load_values("words", "csv") == PADDED
+
+
+def test_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    pd.DataFrame(PADDED[1:], columns=PADDED[0]).to_parquet(tmp_path / "words.parquet")
+
+    assert load_values("words", "parquet") == PADDED
+
+
+def test_unknown_source():
+    with pytest.raises(ValueError):
+        load_values("words", "excel")
+    with pytest.raises(ValueError):
+        load_values("words", "remote")
+    with pytest.raises(FileNotFoundError):
+        load_values("words", "csv")
@@ -1,12 +1,37 @@
 import itertools
 import pathlib
+import sqlite3
 from unittest.mock import Mock, patch
 
 import pytest
+from genanki.apkg_schema import APKG_SCHEMA
 
 from anki_sync.core.sql import AnkiDatabase
 
 
+@pytest.fixture
+def collection_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    """A small Anki collection with two notes, three cards and some reviews."""
+    db_path = tmp_path / "collection.anki2"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(APKG_SCHEMA)
+    conn.executemany(
+        "INSERT INTO notes VALUES (?, ?, 1, 0, -1, '', '', '', 0, 0, '')",
+        [(1, "guid_a"), (2, "guid_b")],
+    )
+    conn.executemany(
+        "INSERT INTO cards VALUES (?, ?, 1, ?, 0, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+        [(10, 1, 0), (11, 1, 1), (20, 2, 0)],
+    )
+    conn.executemany(
+        "INSERT INTO revlog VALUES (?, ?, -1, 3, 1, 0, 2500, 1000, 0)",
+        [(100, 10), (101, 10), (200, 20)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
 class Test_AnkiDatabase:
 
     @patch("anki_sync.core.sql.sqlite3")
@@ -41,3 +66,107 @@ class Test_AnkiDatabase:
 
         with pytest.raises(FileNotFoundError) as err:
             AnkiDatabase(mock_path)
+
+    def test_get_note_id_by_guid(self, collection_path: pathlib.Path):
+        dut = AnkiDatabase(collection_path)
+
+        assert dut.get_note_id_by_guid("guid_b") == (2, True)
+        assert dut.load_guid_index() == {"guid_a": 1, "guid_b": 2}
+
+        note_id, exists = dut.get_note_id_by_guid("missing")
+        assert exists is False
+        assert note_id > 2
+
+    def test_prefetch_history(self, collection_path: pathlib.Path):
+        dut = AnkiDatabase(collection_path)
+
+        with pytest.raises(RuntimeError):
+            dut.get_prefetched_cards(1)
+
+        dut.prefetch_history([1])
+
+        cards = dut.get_prefetched_cards(1)
+        assert [(c["id"], c["ord"]) for c in cards] == [(10, 0), (11, 1)]
+        assert [r["id"] for r in dut.get_prefetched_revlog(10)] == [100, 101]
+        assert dut.get_prefetched_revlog(11) == []
+        # note 2 was not requested so neither its cards nor its reviews are loaded
+        assert dut.get_prefetched_cards(2) == []
+        assert dut.get_prefetched_revlog(20) == []
+
+    def test_copy_history(self, tmp_path: pathlib.Path, collection_path: pathlib.Path):
+        dut = AnkiDatabase(collection_path)
+
+        conn = sqlite3.connect(tmp_path / "package.anki2", uri=True)
+        conn.executescript(APKG_SCHEMA)
+        dut.copy_history(conn.cursor(), [1, 1], deck_id=42)
+
+        assert conn.execute("SELECT id, nid, did, ord FROM cards").fetchall() == [
+            (10, 1, 42, 0),
+            (11, 1, 42, 1),
+        ]
+        assert conn.execute("SELECT id, cid FROM revlog").fetchall() == [
+            (100, 10),
+            (101, 10),
+        ]
+        # the collection is detached again and was never written to
+        assert conn.execute("PRAGMA database_list").fetchall()[-1][1] != "old"
+        assert dut.conn.execute("SELECT count(*) FROM cards").fetchone() == (3,)
+
+    def test_read_only(self, collection_path: pathlib.Path):
+        with AnkiDatabase(collection_path) as dut:
+            with pytest.raises(sqlite3.OperationalError):
+                dut.conn.execute("DELETE FROM notes")
+            assert dut.conn.in_transaction
+
+        assert dut.conn is None
+
+    def test_snapshot(self, collection_path: pathlib.Path):
+        with AnkiDatabase(collection_path, snapshot=True) as dut:
+            assert dut.read_path != collection_path
+
+            # Anki keeps writing to the collection while we sync from the copy
+            conn = sqlite3.connect(collection_path, timeout=0)
+            conn.execute("DELETE FROM notes WHERE id = 2")
+            conn.commit()
+            conn.close()
+
+            assert dut.load_guid_index() == {"guid_a": 1, "guid_b": 2}
+            snapshot_path = dut.read_path
+
+        assert not snapshot_path.exists()
+        assert dut.read_path == collection_path
+
+    def test_query(self, collection_path: pathlib.Path):
+        dut = AnkiDatabase(collection_path)
+
+        assert dut.query("SELECT id, guid FROM notes ORDER BY id") == [
+            (1, "guid_a"),
+            (2, "guid_b"),
+        ]
+        row = dut.query_one("SELECT * FROM cards WHERE id = ?", (11,), named=True)
+        assert (row["nid"], row["ord"]) == (1, 1)
+        assert dut.query_one("SELECT * FROM cards WHERE id = ?", (99,)) is None
+        assert (
+            dut.scalar("SELECT count(*) FROM revlog WHERE cid = :cid", {"cid": 10}) == 2
+        )
+        assert [
+            r[0] for r in dut.stream("SELECT id FROM cards ORDER BY id", size=2)
+        ] == [
+            10,
+            11,
+            20,
+        ]
+
+    def test_iter_revlog(self, collection_path: pathlib.Path):
+        dut = AnkiDatabase(collection_path)
+
+        chunks = list(dut.iter_revlog(columns=["cid", "ease"], chunk_size=2))
+        assert [list(c.index) for c in chunks] == [[100, 101], [200]]
+        assert list(chunks[0].columns) == ["cid", "ease"]
+        assert chunks[0]["ease"].dtype == "int64"
+
+        (chunk,) = dut.iter_revlog(columns=["ease"], downcast=True)
+        assert chunk["ease"].dtype == "int8"
+
+        with pytest.raises(ValueError):
+            next(dut.iter_cards(columns=["nid", "missing"]))
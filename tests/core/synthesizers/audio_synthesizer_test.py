@@ -0,0 +1,76 @@
+import pathlib
+from unittest.mock import patch
+
+import pytest
+
+from anki_sync.core.models.genanki import MediaFile, MediaManifest
+from anki_sync.core.synthesizers.audio_synthesizer import (
+    SYNTHESIZERS,
+    AudioMeta,
+    AudioSynthesizer,
+)
+from anki_sync.core.synthesizers.base import BaseSynthesizer
+from anki_sync.core.synthesizers.cache import AudioCache
+
+
+class EchoSynthesizer(BaseSynthesizer):
+    def synthesize(self, text: str, output_filename: str) -> None:
+        with open(output_filename, "wb") as f:
+            f.write(text.encode("utf-8"))
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "collection.media"
+    path.mkdir()
+    (path / "ένα.mp3").write_bytes(b"one")
+    (path / "folder.mp3").mkdir()
+    return path
+
+
+@pytest.fixture
+def synth(tmp_path, media_dir, monkeypatch) -> AudioSynthesizer:
+    monkeypatch.setitem(SYNTHESIZERS, "echo", EchoSynthesizer)
+    return AudioSynthesizer(
+        media_dir, "echo", max_workers=2, cache=AudioCache(tmp_path / "cache")
+    )
+
+
+def test_media_directory_is_scanned_once(synth):
+    # only files are indexed
+    assert synth.media_files == {"ένα.mp3"}
+
+    with patch("os.stat", side_effect=AssertionError("stat called")):
+        assert synth.media_exists("ένα.mp3")
+        assert not synth.media_exists("δύο.mp3")
+    assert synth.stats["stats_saved"] == 2
+
+
+def test_missing_media_directory(tmp_path, monkeypatch):
+    monkeypatch.setitem(SYNTHESIZERS, "echo", EchoSynthesizer)
+    cache = AudioCache(tmp_path / "cache")
+    synth = AudioSynthesizer(tmp_path / "missing", "echo", max_workers=1, cache=cache)
+    assert synth.media_files == frozenset()
+    synth = AudioSynthesizer(None, "echo", max_workers=1, cache=cache)
+    assert synth.media_files is None
+
+
+def test_installed_audio_is_indexed(synth):
+    synth.submit(AudioMeta("δύο", "δύο.mp3"))
+    stats = synth.join()
+
+    assert stats["generated"] == 1
+    assert synth.media_files == {"ένα.mp3", "δύο.mp3"}
+    assert synth.media_exists("δύο.mp3")
+
+
+def test_manifest_only_stats_indexed_media(synth, media_dir):
+    manifest = MediaManifest(media_dir)
+    for filename in ("ένα.mp3", "missing.mp3"):
+        manifest.add(filename)
+
+    with patch.object(
+        MediaFile, "from_path", side_effect=MediaFile.from_path
+    ) as from_path:
+        assert manifest.resolve(synth.media_files) == ["missing.mp3"]
+    from_path.assert_called_once_with(str(media_dir / "ένα.mp3"))
@@ -0,0 +1,39 @@
+import os
+import stat
+
+import pytest
+
+from anki_sync.core.synthesizers import base
+from anki_sync.core.synthesizers.base import atomic_write
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(b"old")
+
+    with atomic_write(str(path)) as f:
+        f.write(b"new")
+        assert path.read_bytes() == b"old"
+
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["a.mp3"]
+
+
+def test_atomic_write_cleans_up_on_error(tmp_path):
+    path = tmp_path / "a.mp3"
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write(b"partial")
+            raise RuntimeError("connection reset")
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_atomic_write_uses_umask_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(base, "_UMASK", 0o027)
+
+    with atomic_write(str(tmp_path / "a.mp3")) as f:
+        f.write(b"audio")
+
+    assert stat.S_IMODE(os.stat(tmp_path / "a.mp3").st_mode) == 0o640
@@ -0,0 +1,58 @@
+import asyncio
+
+from anki_sync.core.synthesizers import elevenlabs
+from anki_sync.core.synthesizers.base import BaseSynthesizer
+from anki_sync.core.synthesizers.batch import synthesize_batch
+from anki_sync.core.synthesizers.elevenlabs import ElevenLabsSynthesizer
+
+
+class SlowSynthesizer(BaseSynthesizer):
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def synthesize(self, text: str, output_filename: str) -> None:
+        raise NotImplementedError
+
+    async def asynthesize(self, text: str, output_filename: str) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if text == "bad":
+                raise RuntimeError(text)
+        finally:
+            self.in_flight -= 1
+
+
+def test_concurrency_is_bounded():
+    synthesizer = SlowSynthesizer()
+    jobs = [(str(i), f"{i}.mp3") for i in range(10)]
+
+    results = asyncio.run(synthesize_batch(synthesizer, jobs, concurrency=3))
+
+    assert results == [None] * 10
+    assert synthesizer.max_in_flight == 3
+
+
+def test_errors_are_returned_per_job():
+    jobs = [("good", "a.mp3"), ("bad", "b.mp3"), ("good", "c.mp3")]
+
+    results = asyncio.run(synthesize_batch(SlowSynthesizer(), jobs, concurrency=2))
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_async_client_is_shared_per_loop(monkeypatch):
+    monkeypatch.setattr(elevenlabs, "AsyncElevenLabs", lambda **kwargs: object())
+    synthesizer = ElevenLabsSynthesizer()
+
+    async def clients():
+        return synthesizer._get_async_client(), synthesizer._get_async_client()
+
+    first, same = asyncio.run(clients())
+    other, _ = asyncio.run(clients())
+
+    assert first is same
+    assert other is not first
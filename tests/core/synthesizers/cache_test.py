@@ -0,0 +1,118 @@
+import pathlib
+
+import pytest
+
+from anki_sync.core.synthesizers.audio_synthesizer import (
+    SYNTHESIZERS,
+    AudioMeta,
+    AudioSynthesizer,
+)
+from anki_sync.core.synthesizers.base import BaseSynthesizer
+from anki_sync.core.synthesizers.cache import AudioCache, CacheKey
+
+
+class RecordingSynthesizer(BaseSynthesizer):
+    provider = "test"
+    voice = "voice_a"
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def cache_key(self, text: str) -> CacheKey:
+        return CacheKey(self.provider, self.voice, "", text)
+
+    def synthesize(self, text: str, output_filename: str) -> None:
+        self.calls.append(text)
+        with open(output_filename, "wb") as f:
+            f.write(f"{self.voice}:{text}".encode("utf-8"))
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "collection.media"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> AudioCache:
+    return AudioCache(tmp_path / "cache")
+
+
+def sync(media_dir, cache, synthesizer, phrases):
+    SYNTHESIZERS["test"] = lambda: synthesizer
+    try:
+        synth = AudioSynthesizer(media_dir, "test", max_workers=2, cache=cache)
+    finally:
+        del SYNTHESIZERS["test"]
+    for phrase in phrases:
+        synth.submit(AudioMeta(phrase, f"{phrase}.mp3"))
+    return synth.join()
+
+
+def test_cache_key_normalizes_text():
+    assert CacheKey("google", "v", "m", " καλή  μέρα\n") == CacheKey(
+        "google", "v", "m", "καλή μέρα"
+    )
+    assert CacheKey("google", "v", "m", "μέρα").digest != (
+        CacheKey("google", "other", "m", "μέρα").digest
+    )
+
+
+def test_reuses_cache_across_directories(tmp_path, cache):
+    synthesizer = RecordingSynthesizer()
+    for deck in ("a", "b"):
+        media_dir = tmp_path / deck
+        media_dir.mkdir()
+        sync(media_dir, cache, synthesizer, ["ένα", "δύο"])
+        assert (media_dir / "ένα.mp3").read_bytes() == "voice_a:ένα".encode("utf-8")
+
+    assert sorted(synthesizer.calls) == sorted(["ένα", "δύο"])
+
+
+def test_voice_change_resynthesizes(media_dir, cache):
+    synthesizer = RecordingSynthesizer()
+    sync(media_dir, cache, synthesizer, ["ένα"])
+
+    stats = sync(media_dir, cache, synthesizer, ["ένα"])
+    assert stats["exists"] == 1
+
+    synthesizer.voice = "voice_b"
+    stats = sync(media_dir, cache, synthesizer, ["ένα"])
+    assert stats["generated"] == 1
+    assert (media_dir / "ένα.mp3").read_bytes() == "voice_b:ένα".encode("utf-8")
+
+    # switching back only needs the cache
+    synthesizer.voice = "voice_a"
+    stats = sync(media_dir, cache, synthesizer, ["ένα"])
+    assert stats["cached"] == 1
+    assert synthesizer.calls == ["ένα", "ένα"]
+
+
+def test_adopts_existing_media(media_dir, cache):
+    (media_dir / "ένα.mp3").write_bytes(b"legacy")
+    synthesizer = RecordingSynthesizer()
+
+    stats = sync(media_dir, cache, synthesizer, ["ένα"])
+    assert stats["adopted"] == 1
+    assert synthesizer.calls == []
+    assert cache.contains(synthesizer.cache_key("ένα"))
+    assert cache.media_keys(media_dir) == {
+        "ένα.mp3": synthesizer.cache_key("ένα").digest
+    }
+
+
+class FailingSynthesizer(RecordingSynthesizer):
+    def synthesize(self, text: str, output_filename: str) -> None:
+        if text == "bad":
+            raise RuntimeError("quota exceeded")
+        super().synthesize(text, output_filename)
+
+
+def test_synthesis_errors_are_counted(media_dir, cache, capsys):
+    stats = sync(media_dir, cache, FailingSynthesizer(), ["bad", "good"])
+
+    assert stats["failed"] == 1
+    assert stats["generated"] == 1
+    assert "bad: RuntimeError('quota exceeded')" in capsys.readouterr().out
+    assert not (media_dir / "bad.mp3").exists()
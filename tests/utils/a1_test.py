@@ -0,0 +1,17 @@
+from anki_sync.utils.a1 import column_letter, quote_sheet
+
+
+def test_column_letter():
+    assert [column_letter(i) for i in (0, 25, 26, 51, 701, 702)] == [
+        "A",
+        "Z",
+        "AA",
+        "AZ",
+        "ZZ",
+        "AAA",
+    ]
+
+
+def test_quote_sheet():
+    assert quote_sheet("Verbs Conjugated") == "'Verbs Conjugated'"
+    assert quote_sheet("Mike's") == "'Mike''s'"
@@ -0,0 +1,96 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from anki_sync.utils.metrics import Metrics
+
+
+@pytest.fixture
+def clock():
+    """A perf_counter the test moves forward by hand."""
+    now = [0.0]
+    with patch("anki_sync.utils.metrics.time.perf_counter", lambda: now[0]):
+        yield now
+
+
+def test_repeated_timers_accumulate(clock):
+    metrics = Metrics()
+    for seconds in (1.0, 3.0):
+        with metrics.timer("stage"):
+            clock[0] += seconds
+
+    stats = metrics.timers["stage"]
+    assert (stats.calls, stats.total, stats.max) == (2, 4.0, 3.0)
+
+
+def test_nested_timers_are_recorded_separately(clock):
+    metrics = Metrics()
+    with metrics.timer("outer"):
+        clock[0] += 1.0
+        with metrics.timer("inner"):
+            clock[0] += 2.0
+
+    assert metrics.timers["inner"].total == 2.0
+    # the outer stage includes the time of the inner one
+    assert metrics.timers["outer"].total == 3.0
+
+
+def test_timer_records_failing_blocks(clock):
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.timer("stage"):
+            clock[0] += 1.0
+            raise ValueError("boom")
+    assert metrics.timers["stage"].calls == 1
+
+
+def test_timed_decorator(clock):
+    metrics = Metrics()
+
+    @metrics.timed("double")
+    def double(x):
+        clock[0] += 0.5
+        return 2 * x
+
+    assert [double(1), double(2)] == [2, 4]
+    assert double.__name__ == "double"
+    assert (metrics.timers["double"].calls, metrics.timers["double"].total) == (2, 1.0)
+
+
+def test_counters_and_reset():
+    metrics = Metrics()
+    metrics.count("rows")
+    metrics.count("rows", 4)
+    metrics.count("skipped", 0)
+    assert metrics.counters == {"rows": 5, "skipped": 0}
+
+    metrics.reset()
+    assert metrics.to_dict() == {"timers": {}, "counters": {}}
+
+
+def test_json_round_trip(clock, tmp_path):
+    metrics = Metrics()
+    with metrics.timer("stage"):
+        clock[0] += 1.5
+    metrics.count("rows", 3)
+
+    path = tmp_path / "metrics.json"
+    metrics.dump_json(path)
+    assert json.loads(path.read_text()) == {
+        "timers": {"stage": {"calls": 1, "total": 1.5, "max": 1.5}},
+        "counters": {"rows": 3},
+    }
+    assert json.loads(path.read_text()) == metrics.to_dict()
+
+
+def test_summary_lists_slowest_stage_first(clock):
+    metrics = Metrics()
+    for name, seconds in (("fast", 1.0), ("slow", 2.0)):
+        with metrics.timer(name):
+            clock[0] += seconds
+    metrics.count("rows", 7)
+
+    lines = metrics.summary().splitlines()
+    assert [line.split()[0] for line in lines[1:3]] == ["slow", "fast"]
+    assert lines[-1].split() == ["rows", "7"]
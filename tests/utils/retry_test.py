@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+
+from anki_sync.utils.retry import RetryScheduler, is_retryable, retry_after
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Response(dict):
+    """Stand-in for httplib2.Response, a dict of headers with a status."""
+
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+
+
+class HttpError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"status {status}")
+        self.resp = Response(status, headers or {})
+
+
+@pytest.fixture
+def scheduler():
+    with patch("anki_sync.utils.retry.time.sleep") as sleep:
+        scheduler = RetryScheduler("test", rate=1000.0, burst=1000, max_attempts=3)
+        scheduler.sleep = sleep
+        yield scheduler
+
+
+def test_retries_rate_limited_calls(scheduler):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ApiError(429)
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert len(calls) == 3
+    assert scheduler.sleep.call_count == 2
+
+
+def test_does_not_retry_client_errors(scheduler):
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        scheduler.call(bad_request)
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_attempts(scheduler):
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        raise HttpError(503)
+
+    with pytest.raises(HttpError):
+        scheduler.call(unavailable)
+    assert len(calls) == 3
+
+
+def test_honors_retry_after(scheduler):
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ApiError(429, {"Retry-After": "7"})
+        return "ok"
+
+    with patch("anki_sync.utils.retry.random.uniform", return_value=0.0):
+        assert scheduler.call(throttled) == "ok"
+    scheduler.sleep.assert_any_call(7.0)
+
+
+def test_retry_after():
+    assert retry_after(ApiError(429, {"retry-after": "2.5"})) == 2.5
+    assert retry_after(HttpError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(HttpError(429, {"retry-after": "not a date"})) is None
+    assert retry_after(ApiError(429)) is None
+    # dates in the past mean there is nothing left to wait for
+    assert (
+        retry_after(ApiError(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+        == 0.0
+    )
+
+
+def test_is_retryable():
+    assert is_retryable(ConnectionError())
+    assert is_retryable(HttpError(500))
+    assert not is_retryable(HttpError(404))
+    assert not is_retryable(ValueError())